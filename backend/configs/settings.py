@@ -13,6 +13,12 @@ os.makedirs(MODEL_DIR, exist_ok=True)
 # Environment variables for transformers (using HF_HOME as per v5 standard)
 os.environ["HF_HOME"] = MODEL_DIR
 
+# Visit store persistence (optional). When REDIS_URL is set and the redis
+# package is installed, visit state is written through to Redis with a TTL so
+# it survives restarts and is visible to other workers.
+REDIS_URL = os.environ.get("REDIS_URL", "")
+VISIT_TTL_SECONDS = 24 * 3600
+
 # CORS settings
 CORS_ORIGINS = [
     "http://localhost:3000",
@@ -20,7 +26,19 @@ CORS_ORIGINS = [
 
 # Model names
 WHISPER_MODEL_NAME = "openai/whisper-large"
-LLM_MODEL_NAME = "mistralai/Mistral-7B-Instruct-v0.3"
+# Overridable so deployments can point at a pre-quantized variant, e.g.
+# TheBloke/Mistral-7B-Instruct-v0.3-AWQ (int4 weights cut VRAM ~14 GB -> ~4 GB
+# and decode weight bandwidth per token ~4x on CUDA)
+LLM_MODEL_NAME = os.environ.get(
+    "LLM_MODEL_NAME", "mistralai/Mistral-7B-Instruct-v0.3"
+)
+
+# Weight quantization method for the LLM ("" for none). With the vLLM
+# backend, "awq"/"gptq" are passed to the engine and require a matching
+# pre-quantized model. With the transformers backend, "bnb4" loads the
+# weights 4-bit (nf4) via bitsandbytes, cutting weight bytes moved per
+# decoded token ~4x.
+LLM_QUANTIZATION = os.environ.get("LLM_QUANTIZATION", "")
 
 # Audio processing settings
 CHUNK_DURATION = 10  # seconds
@@ -28,10 +46,58 @@ OVERLAP_DURATION = 1  # seconds
 SAMPLE_RATE = 16000  # Hz
 MAX_OVERLAP_CHARS = 80
 
+# Transcription backend: "transformers" (in-process HF Whisper),
+# "faster_whisper" (CTranslate2 int8 kernels + built-in VAD batching,
+# requires the optional faster-whisper package), or "onnx" (ONNX Runtime
+# fused/quantized kernels via optimum, same generate API as transformers)
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "transformers")
+
+# Weight quantization for the transformers Whisper path ("" for none):
+# "bnb4" loads nf4 weights via bitsandbytes on CUDA, "int8" applies torch
+# dynamic quantization to the Linear layers on CPU
+WHISPER_QUANT = os.environ.get("WHISPER_QUANT", "")
+
+# How many visits may run Whisper inference at once. Concurrent generate
+# calls on a single CUDA context only time-slice each other, so the default
+# serializes them; raise per GPU when more are available.
+WHISPER_CONCURRENCY = int(os.environ.get("WHISPER_CONCURRENCY", "1"))
+
+# Chunks whose RMS amplitude falls below this are treated as silence and
+# skipped before feature extraction: silence still pays full encoder+decoder
+# cost and tends to decode into hallucinated text. 0 disables the gate.
+WHISPER_SILENCE_RMS = float(os.environ.get("WHISPER_SILENCE_RMS", "0.004"))
+
+# How many audio chunks to transcribe per Whisper generate call. Batched
+# decoding amortizes the encoder and kernel-launch cost across chunks; size
+# to VRAM (8 fits whisper-large comfortably on a 24 GB card).
+WHISPER_BATCH_SIZE = int(os.environ.get("WHISPER_BATCH_SIZE", "8"))
+
+# LLM serving backend: "transformers" (in-process HF generate) or "vllm"
+# (continuous batching + PagedAttention, requires the optional vllm package)
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "transformers")
+LLM_MAX_MODEL_LEN = 8192
+LLM_GPU_MEMORY_UTILIZATION = 0.9
+
+# Speculative decoding (vLLM backend only). The SOAP output is highly
+# templated (fixed headers, bullet prefixes, ICD-10 parentheticals), so a
+# small draft model gets unusually high acceptance rates.
+LLM_SPECULATIVE_DRAFT_MODEL = os.environ.get(
+    "LLM_SPECULATIVE_DRAFT_MODEL", ""
+)  # e.g. "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+LLM_NUM_SPECULATIVE_TOKENS = 5
+
+# Echo generated tokens to the console (debugging aid). Off by default:
+# per-token prints cost a write syscall + flush each, thousands per visit.
+LLM_STREAM_TO_CONSOLE = os.environ.get("LLM_STREAM_TO_CONSOLE", "") in ("1", "true")
+
 # LLM generation settings
 LLM_MAX_TOKENS = 1500
 SOAP_SECTION_MAX_TOKENS = 800
 
+# Transcripts shorter than this are checked for section-specific evidence
+# before spending an LLM generation on a canned "nothing documented" answer
+SOAP_SHORT_TRANSCRIPT_CHARS = 200
+
 # Logging configuration
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
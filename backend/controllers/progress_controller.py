@@ -1,19 +1,80 @@
 """Progress streaming controller for SSE."""
 
-import json
+import time
 import asyncio
 from typing import AsyncGenerator
+
+try:
+    import orjson
+
+    def _encode_sse(event_data: dict) -> bytes:
+        """Encode an SSE data frame with orjson (bytes, no re-encode)."""
+        return b"data: " + orjson.dumps(event_data) + b"\n\n"
+
+except ImportError:
+    import json
+
+    def _encode_sse(event_data: dict) -> bytes:
+        """Fallback SSE frame encoding via the standard-library json."""
+        return f"data: {json.dumps(event_data)}\n\n".encode("utf-8")
+
 from fastapi import HTTPException
 from starlette.responses import StreamingResponse
-from utils.storage import visits_store
+from utils.storage import visits_store, subscribe_to_visit, unsubscribe_from_visit
 from utils.logger import logger
 
+# How long to wait on the subscriber queue before re-checking the visit
+_QUEUE_POLL_TIMEOUT = 30.0
+
+
+def _build_event(visit_data: dict, visit_id: str) -> dict:
+    """Build the SSE event payload for a visit state snapshot."""
+    status = visit_data.get("status")
+    event_data = {
+        "visit_id": visit_id,
+        "status": status,
+        "progress": visit_data.get("progress", 0),
+        "timestamp": time.monotonic(),
+    }
+
+    # Add chunk processing information only if currently available
+    if (
+        visit_data.get("current_chunk") is not None
+        and visit_data.get("total_chunks") is not None
+        and visit_data.get("chunk_status") is not None
+    ):
+        event_data["current_chunk"] = visit_data.get("current_chunk")
+        event_data["total_chunks"] = visit_data.get("total_chunks")
+        event_data["chunk_status"] = visit_data.get("chunk_status")
+
+    # Add section processing information if available (during SOAP generation)
+    if visit_data.get("completed_sections") is not None:
+        event_data["completed_sections"] = visit_data.get("completed_sections")
+
+    # Add additional data based on status
+    if status == "completed":
+        event_data["soap_note"] = visit_data.get("soap_note")
+        event_data["transcript"] = visit_data.get("transcript")
+        event_data["generation_time"] = visit_data.get("generation_time")
+        event_data["audio_duration"] = visit_data.get("audio_duration")
+        event_data["transcription_time"] = visit_data.get("transcription_time")
+    elif status == "error":
+        event_data["error"] = visit_data.get("error")
+
+    return event_data
+
 
 async def get_progress_stream(visit_id: str):
     """
     SSE endpoint to stream real-time progress updates for a visit.
+
+    Updates are pushed by the processing pipeline through a per-visit
+    subscriber queue, so progress edges reach the client immediately instead
+    of being discovered by polling.
     """
-    if visit_id not in visits_store:
+    # load() also caches a Redis-recovered visit locally, so the stream's
+    # subsequent synchronous reads all hit the local dict
+    if await visits_store.load(visit_id) is None:
         logger.warning(
             f"Visit {visit_id}: Progress stream requested for non-existent visit"
         )
@@ -23,146 +84,58 @@ async def get_progress_stream(visit_id: str):
 
     async def event_stream() -> AsyncGenerator[str, None]:
         """Generate Server-Sent Events for progress updates"""
-        last_status = None
-        last_progress = None
-        last_chunk = None
-        last_chunk_status = None
-        last_section = None
-
-        # Send initial update immediately when stream starts
-        if visit_id in visits_store:
-            visit_data = visits_store[visit_id]
-            initial_status = visit_data.get("status")
-            initial_progress = visit_data.get("progress", 0)
-
-            initial_event_data = {
-                "visit_id": visit_id,
-                "status": initial_status,
-                "progress": initial_progress,
-                "timestamp": asyncio.get_event_loop().time(),
-            }
-
-            # Add chunk information if available (during transcription)
-            if visit_data.get("current_chunk") is not None:
-                initial_event_data["current_chunk"] = visit_data.get("current_chunk")
-                initial_event_data["total_chunks"] = visit_data.get("total_chunks")
-                initial_event_data["chunk_status"] = visit_data.get("chunk_status")
-
-            # Add section information if available (during SOAP generation)
-            if visit_data.get("current_section") is not None:
-                initial_event_data["current_section"] = visit_data.get(
-                    "current_section"
-                )
-
-            if initial_status == "completed":
-                initial_event_data["soap_note"] = visit_data.get("soap_note")
-            elif initial_status == "error":
-                initial_event_data["error"] = visit_data.get("error")
-
-            yield f"data: {json.dumps(initial_event_data)}\n\n"
+        queue = subscribe_to_visit(visit_id)
+        try:
+            # Send the current state immediately when the stream starts
+            visit_data = visits_store.get(visit_id)
+            if visit_data is None:
+                return
+
+            event_data = _build_event(dict(visit_data), visit_id)
+            yield _encode_sse(event_data)
             logger.info(
-                f"Visit {visit_id}: SSE initial update sent - Status: {initial_status}, Progress: {initial_progress}%"
-            )
-
-            last_status = initial_status
-            last_progress = initial_progress
-            last_chunk = visit_data.get("current_chunk")
-            last_chunk_status = visit_data.get("chunk_status")
-            last_section = visit_data.get("current_section")
-
-        while True:
-            if visit_id not in visits_store:
-                break
-
-            visit_data = visits_store[visit_id]
-            current_status = visit_data.get("status")
-            current_progress = visit_data.get("progress", 0)
-
-            # Check if chunk processing info has changed
-            current_chunk = visit_data.get("current_chunk")
-            current_chunk_status = visit_data.get("chunk_status")
-            chunk_changed = (
-                current_chunk != last_chunk or current_chunk_status != last_chunk_status
+                f"Visit {visit_id}: SSE initial update sent - Status: {event_data['status']}, Progress: {event_data['progress']}%"
             )
 
-            # Check if section processing info has changed
-            current_section = visit_data.get("current_section")
-            section_changed = current_section != last_section
-
-            # Only trigger update for chunk changes if we currently have chunk info
-            valid_chunk_change = chunk_changed and (
-                current_chunk is not None or last_chunk is not None
-            )
+            if event_data["status"] in ("completed", "error"):
+                logger.info(
+                    f"Visit {visit_id}: SSE stream ending - Final status: {event_data['status']}"
+                )
+                return
 
-            if (
-                current_status != last_status
-                or current_progress != last_progress
-                or valid_chunk_change
-                or section_changed
-            ):
-                event_data = {
-                    "visit_id": visit_id,
-                    "status": current_status,
-                    "progress": current_progress,
-                    "timestamp": asyncio.get_event_loop().time(),
-                }
-
-                # Add chunk processing information only if currently available
-                if (
-                    visit_data.get("current_chunk") is not None
-                    and visit_data.get("total_chunks") is not None
-                    and visit_data.get("chunk_status") is not None
-                ):
-                    event_data["current_chunk"] = visit_data.get("current_chunk")
-                    event_data["total_chunks"] = visit_data.get("total_chunks")
-                    event_data["chunk_status"] = visit_data.get("chunk_status")
-
-                # Add section processing information if available
-                if visit_data.get("current_section") is not None:
-                    event_data["current_section"] = visit_data.get("current_section")
-
-                # Add additional data based on status
-                if current_status == "completed":
-                    event_data["soap_note"] = visit_data.get("soap_note")
-                    event_data["transcript"] = visit_data.get("transcript")
-                    event_data["generation_time"] = visit_data.get("generation_time")
-                    event_data["audio_duration"] = visit_data.get("audio_duration")
-                    event_data["transcription_time"] = visit_data.get(
-                        "transcription_time"
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(
+                        queue.get(), timeout=_QUEUE_POLL_TIMEOUT
                     )
-                elif current_status == "error":
-                    event_data["error"] = visit_data.get("error")
+                except asyncio.TimeoutError:
+                    # No updates for a while; stop if the visit disappeared
+                    if visit_id not in visits_store:
+                        break
+                    continue
 
-                yield f"data: {json.dumps(event_data)}\n\n"
+                event_data = _build_event(snapshot, visit_id)
+                yield _encode_sse(event_data)
 
-                # Log progress updates
                 chunk_info = ""
-                if current_chunk is not None:
-                    chunk_info = f", Chunk: {current_chunk}/{visit_data.get('total_chunks', '?')}"
+                if snapshot.get("current_chunk") is not None:
+                    chunk_info = f", Chunk: {snapshot.get('current_chunk')}/{snapshot.get('total_chunks', '?')}"
 
                 section_info = ""
-                if current_section is not None:
-                    section_info = f", Section: {current_section}"
+                if snapshot.get("completed_sections") is not None:
+                    section_info = f", Sections done: {snapshot.get('completed_sections')}"
 
                 logger.info(
-                    f"Visit {visit_id}: SSE update sent - Status: {current_status}, Progress: {current_progress}%{chunk_info}{section_info}"
+                    f"Visit {visit_id}: SSE update sent - Status: {event_data['status']}, Progress: {event_data['progress']}%{chunk_info}{section_info}"
                 )
 
-                last_status = current_status
-                last_progress = current_progress
-                last_chunk = current_chunk
-                last_chunk_status = current_chunk_status
-                last_section = current_section
-
-                # Break the loop if processing is complete or failed
-                if current_status in ["completed", "error"]:
+                if event_data["status"] in ("completed", "error"):
                     logger.info(
-                        f"Visit {visit_id}: SSE stream ending - Final status: {current_status}"
+                        f"Visit {visit_id}: SSE stream ending - Final status: {event_data['status']}"
                     )
                     break
-
-            # Wait before next check - shorter interval for better responsiveness
-            await asyncio.sleep(0.2)
+        finally:
+            unsubscribe_from_visit(visit_id, queue)
 
     return StreamingResponse(
         event_stream(),
@@ -11,10 +11,10 @@ async def get_soap_note(visit_id: str):
     Fetches the generated SOAP note for a specific visit ID.
     Returns JSON with soap_note and soap_status.
     """
-    if visit_id not in visits_store:
+    visit_data = await visits_store.load(visit_id)
+    if visit_data is None:
         raise HTTPException(status_code=404, detail="Visit not found")
 
-    visit_data = visits_store[visit_id]
     current_status = visit_data.get("status", "unknown")
 
     # Prepare response data
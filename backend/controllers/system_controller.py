@@ -5,11 +5,81 @@ import subprocess
 import re
 import torch
 import psutil
-from helpers.audio_converter import check_ffmpeg_availability
+from functools import lru_cache
+from helpers.audio_converter import probe_ffmpeg
 
 
-async def get_system_info():
-    """Get comprehensive system information."""
+def _detect_cpu_name() -> str:
+    """Detect the CPU brand string, with Apple Silicon sysctl fallbacks."""
+    cpu_name = platform.processor() or "Unknown"
+    if not cpu_name or cpu_name == "" or cpu_name == "arm":
+        try:
+            cpu_name = (
+                subprocess.check_output(["sysctl", "-n", "machdep.cpu.brand_string"])
+                .decode()
+                .strip()
+            )
+        except Exception:
+            try:
+                cpu_brand = (
+                    subprocess.check_output(["sysctl", "-n", "machdep.cpu.brand"])
+                    .decode()
+                    .strip()
+                )
+                if cpu_brand:
+                    cpu_name = f"Apple {cpu_brand}"
+                else:
+                    cpu_name = "Apple Silicon"
+            except Exception:
+                cpu_name = "Apple Silicon" if cpu_name == "arm" else "Unknown"
+    return cpu_name
+
+
+def _detect_os_name() -> str:
+    """Detect a human-readable OS name and version."""
+    os_name = platform.system()
+    if os_name == "Darwin":
+        try:
+            macos_version = (
+                subprocess.check_output(["sw_vers", "-productVersion"])
+                .decode()
+                .strip()
+            )
+            os_name = f"macOS {macos_version}"
+        except Exception:
+            os_name = f"macOS {platform.release()}"
+    elif os_name == "Windows":
+        os_name = f"Windows {platform.release()}"
+    elif os_name == "Linux":
+        try:
+            import distro
+
+            os_name = f"{distro.name()} {distro.version()}"
+        except Exception:
+            os_name = f"Linux {platform.release()}"
+    else:
+        os_name = f"{platform.system()} {platform.release()}"
+    return os_name
+
+
+# CPU/OS identity never changes within a process; probe once at import so the
+# sysctl/sw_vers subprocess cascades never run on a request path
+_STATIC_SYSINFO = {
+    "hostname": platform.node(),
+    "cpu_name": _detect_cpu_name(),
+    "os": _detect_os_name(),
+}
+
+
+@lru_cache(maxsize=1)
+def _compute_system_info() -> dict:
+    """
+    Compute system information once per process.
+
+    Everything probed here (CPU/GPU identity, OS version, FFmpeg presence,
+    total memory) is immutable for the process lifetime, so the result is
+    memoized; only the first call pays for the subprocess probes.
+    """
     try:
         cpu_count = psutil.cpu_count(logical=False)
         cpu_count_logical = psutil.cpu_count(logical=True)
@@ -40,87 +110,26 @@ async def get_system_info():
                 else:
                     gpu_cores = "Integrated"
                 gpu_memory = "Shared with System RAM"
-            except:
+            except Exception:
                 gpu_name = "Apple Silicon GPU (MPS)"
                 gpu_cores = "Integrated"
                 gpu_memory = "Shared with System RAM"
 
-        cpu_name = platform.processor() or "Unknown"
-        if not cpu_name or cpu_name == "" or cpu_name == "arm":
-            try:
-                cpu_name = (
-                    subprocess.check_output(
-                        ["sysctl", "-n", "machdep.cpu.brand_string"]
-                    )
-                    .decode()
-                    .strip()
-                )
-            except:
-                try:
-                    cpu_brand = (
-                        subprocess.check_output(["sysctl", "-n", "machdep.cpu.brand"])
-                        .decode()
-                        .strip()
-                    )
-                    if cpu_brand:
-                        cpu_name = f"Apple {cpu_brand}"
-                    else:
-                        cpu_name = "Apple Silicon"
-                except:
-                    cpu_name = "Apple Silicon" if cpu_name == "arm" else "Unknown"
-
-        os_name = platform.system()
-        if os_name == "Darwin":
-            try:
-                macos_version = (
-                    subprocess.check_output(["sw_vers", "-productVersion"])
-                    .decode()
-                    .strip()
-                )
-                os_name = f"macOS {macos_version}"
-            except:
-                os_name = f"macOS {platform.release()}"
-        elif os_name == "Windows":
-            os_name = f"Windows {platform.release()}"
-        elif os_name == "Linux":
-            try:
-                import distro
-
-                os_name = f"{distro.name()} {distro.version()}"
-            except:
-                os_name = f"Linux {platform.release()}"
-        else:
-            os_name = f"{platform.system()} {platform.release()}"
-
-        # Check FFmpeg availability
-        ffmpeg_available = check_ffmpeg_availability()
-        ffmpeg_version = "Not Available"
-        if ffmpeg_available:
-            try:
-                result = subprocess.run(
-                    ["ffmpeg", "-version"], capture_output=True, text=True, timeout=5
-                )
-                if result.returncode == 0:
-                    first_line = result.stdout.split("\n")[0]
-                    if "ffmpeg version" in first_line:
-                        ffmpeg_version = first_line.split(" ")[2]
-            except:
-                ffmpeg_version = "Available (version unknown)"
+        # Check FFmpeg availability and version with one cached probe
+        ffmpeg_available, ffmpeg_version = probe_ffmpeg()
 
         from utils.device import get_device
 
         device = get_device()
 
         return {
-            "hostname": platform.node(),
-            "cpu_name": cpu_name,
+            **_STATIC_SYSINFO,
             "cpu_cores": cpu_count,
             "cpu_threads": cpu_count_logical,
             "gpu_name": gpu_name,
             "gpu_cores": gpu_cores,
             "total_memory": f"{total_memory_gb} GB",
             "gpu_memory": gpu_memory,
-            "os": os_name,
             "device": device,
             "ffmpeg_available": ffmpeg_available,
             "ffmpeg_version": ffmpeg_version,
@@ -147,3 +156,8 @@ async def get_system_info():
         }
     except Exception as e:
         return {"error": str(e)}
+
+
+async def get_system_info():
+    """Get comprehensive system information (cached after the first call)."""
+    return _compute_system_info()
@@ -1,14 +1,20 @@
 """Visit controller for managing visit-related operations."""
 
+import os
 import uuid
+import hashlib
 import asyncio
+import aiofiles
 from fastapi import HTTPException, UploadFile
 from fastapi.responses import JSONResponse
-from utils.storage import visits_store
+from utils.storage import visits_store, update_visit, processed_hashes
 from utils.logger import logger
 from services.audio_processor import process_audio_file
 from configs.settings import CACHE_DIR
 
+# Size of each chunk streamed from the upload to disk
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
 
 async def create_visit():
     """
@@ -35,8 +41,8 @@ async def process_soap_note(visit_id: str, audio_file: UploadFile):
     Supports a wide variety of formats through FFmpeg conversion.
     Returns "queued" response immediately after starting async processing.
     """
-    # Check if visit exists
-    if visit_id not in visits_store:
+    # Check if visit exists (single fetch; avoids membership-test + subscript)
+    if await visits_store.load(visit_id) is None:
         logger.warning(
             f"Visit {visit_id}: Audio upload attempted for non-existent visit"
         )
@@ -46,17 +52,57 @@ async def process_soap_note(visit_id: str, audio_file: UploadFile):
     audio_file_path = f"{CACHE_DIR}/{visit_id}_{audio_file.filename}"
 
     try:
-        # Save the uploaded file
-        with open(audio_file_path, "wb") as buffer:
-            content = await audio_file.read()
-            buffer.write(content)
-
-        # Update visit status
-        visits_store[visit_id]["status"] = "queued"
-        visits_store[visit_id]["audio_file_path"] = audio_file_path
+        # Stream the upload to disk in chunks; peak memory stays at one
+        # chunk instead of the whole recording, and the event loop is never
+        # blocked on a synchronous write
+        total_bytes = 0
+        hasher = hashlib.sha256()
+        async with aiofiles.open(audio_file_path, "wb") as buffer:
+            while chunk := await audio_file.read(UPLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                await buffer.write(chunk)
+                total_bytes += len(chunk)
+        digest = hasher.hexdigest()
 
         logger.info(
-            f"Visit {visit_id}: Audio file uploaded successfully ({audio_file.filename}, {len(content)} bytes)"
+            f"Visit {visit_id}: Audio file uploaded successfully ({audio_file.filename}, {total_bytes} bytes)"
+        )
+
+        # Duplicate upload: reuse the completed result instead of re-running
+        # the whole transcription + SOAP pipeline
+        source_visit_id = processed_hashes.get(digest)
+        source_data = (
+            await visits_store.load(source_visit_id)
+            if source_visit_id is not None
+            else None
+        )
+        if source_data is not None and source_data.get("status") == "completed":
+            logger.info(
+                f"Visit {visit_id}: Duplicate of already-processed upload; reusing completed SOAP note"
+            )
+            try:
+                os.remove(audio_file_path)
+            except OSError:
+                pass
+            update_visit(
+                visit_id,
+                status="completed",
+                progress=100,
+                audio_sha256=digest,
+                soap_note=source_data.get("soap_note"),
+                transcript=source_data.get("transcript"),
+                generation_time=source_data.get("generation_time"),
+                audio_duration=source_data.get("audio_duration"),
+                transcription_time=source_data.get("transcription_time"),
+            )
+            return JSONResponse(content={"status": "queued"}, status_code=202)
+
+        # Update visit status
+        update_visit(
+            visit_id,
+            status="queued",
+            audio_file_path=audio_file_path,
+            audio_sha256=digest,
         )
 
         # Start async processing without await (fire-and-forget)
@@ -73,10 +119,11 @@ async def get_visit_status(visit_id: str):
     """
     Optional endpoint to check the status of a visit.
     """
-    if visit_id not in visits_store:
+    visit_data = await visits_store.load(visit_id)
+    if visit_data is None:
         raise HTTPException(status_code=404, detail="Visit not found")
 
-    return JSONResponse(content=visits_store[visit_id])
+    return JSONResponse(content=visit_data)
 
 
 async def list_visits():
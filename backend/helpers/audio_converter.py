@@ -1,25 +1,160 @@
 """Audio conversion utilities using FFmpeg."""
 
 import os
+import shutil
+import asyncio
+import functools
 import subprocess
+import numpy as np
 from utils.logger import logger
 
+# Absolute FFmpeg path resolved once at import; using it in the argv also
+# bypasses the PATH search in execvp on every spawn
+_FFMPEG_PATH = shutil.which("ffmpeg")
+
+# Maximum time allowed for a single FFmpeg conversion
+FFMPEG_TIMEOUT = 300  # 5 minutes
+
+
+@functools.cache
+def probe_ffmpeg() -> tuple:
+    """
+    Probe FFmpeg once per process.
+
+    Runs a single `ffmpeg -version` and derives both availability and the
+    version string from it; the result is cached since neither changes
+    within a process lifetime.
+
+    Returns:
+        tuple: (available: bool, version: str)
+    """
+    if _FFMPEG_PATH is None:
+        return False, "Not Available"
 
-def check_ffmpeg_availability() -> bool:
-    """Check if FFmpeg is available in the system PATH."""
     try:
         result = subprocess.run(
-            ["ffmpeg", "-version"], capture_output=True, text=True, timeout=10
+            [_FFMPEG_PATH, "-version"], capture_output=True, text=True, timeout=10
         )
-        return result.returncode == 0
     except (FileNotFoundError, subprocess.TimeoutExpired):
-        return False
+        return False, "Not Available"
+
+    if result.returncode != 0:
+        return False, "Not Available"
+
+    version = "Available (version unknown)"
+    first_line = result.stdout.split("\n", 1)[0]
+    if "ffmpeg version" in first_line:
+        parts = first_line.split(" ")
+        if len(parts) > 2:
+            version = parts[2]
+    return True, version
+
+
+def check_ffmpeg_availability() -> bool:
+    """Check if FFmpeg is available in the system PATH."""
+    return probe_ffmpeg()[0]
 
 
-def convert_to_wav_with_ffmpeg(input_file: str, visit_id: str) -> str:
+def invalidate_ffmpeg_cache() -> None:
+    """Re-resolve FFmpeg and clear the cached probe (mainly for tests)."""
+    global _FFMPEG_PATH
+    _FFMPEG_PATH = shutil.which("ffmpeg")
+    probe_ffmpeg.cache_clear()
+
+
+async def stream_pcm_from_ffmpeg(input_file: str, visit_id: str) -> np.ndarray:
+    """
+    Decode any audio/video file to 16kHz mono float32 PCM via FFmpeg stdout.
+
+    Pipes raw s16le samples straight out of FFmpeg instead of writing a
+    temporary WAV to disk and re-reading it, eliminating two file I/O passes
+    per visit.
+
+    Args:
+        input_file: Path to the input audio/video file
+        visit_id: Visit ID for logging purposes
+
+    Returns:
+        np.ndarray: float32 samples in [-1, 1] at 16kHz, ready for Whisper
+
+    Raises:
+        Exception: If decoding fails
+    """
+    try:
+        if not check_ffmpeg_availability():
+            raise Exception("FFmpeg is not installed or not available in system PATH")
+
+        logger.info(
+            f"Visit {visit_id}: Decoding {input_file} to raw PCM via FFmpeg pipe"
+        )
+
+        ffmpeg_cmd = [
+            _FFMPEG_PATH,
+            "-nostdin",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-nostats",
+            "-threads",
+            "0",
+            "-i",
+            input_file,
+            "-f",
+            "s16le",
+            "-acodec",
+            "pcm_s16le",
+            "-ar",
+            "16000",
+            "-ac",
+            "1",
+            "-",
+        ]
+
+        proc = await asyncio.create_subprocess_exec(
+            *ffmpeg_cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(), timeout=FFMPEG_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(ffmpeg_cmd, FFMPEG_TIMEOUT)
+
+        if proc.returncode != 0:
+            raise Exception(
+                f"FFmpeg decoding failed: {stderr.decode('utf-8', 'replace')}"
+            )
+        if not stdout:
+            raise Exception("FFmpeg decoding produced no audio data")
+
+        audio = np.frombuffer(stdout, dtype=np.int16).astype(np.float32) / 32768.0
+        logger.info(
+            f"Visit {visit_id}: Decoded {len(audio)} PCM samples via FFmpeg pipe"
+        )
+        return audio
+
+    except subprocess.TimeoutExpired:
+        logger.error(f"Visit {visit_id}: FFmpeg decoding timed out after 5 minutes")
+        raise Exception(
+            "Audio decoding timed out - file may be too large or corrupted"
+        )
+    except Exception as e:
+        logger.error(f"Visit {visit_id}: Error during FFmpeg decoding: {str(e)}")
+        raise Exception(f"Failed to decode audio file: {str(e)}")
+
+
+async def convert_to_wav_with_ffmpeg(input_file: str, visit_id: str) -> str:
     """
     Convert any audio/video file to WAV format using FFmpeg.
 
+    FFmpeg runs as an asyncio subprocess, so the event loop keeps servicing
+    other requests (uploads, SSE streams) while the conversion runs on its
+    own cores.
+
     Args:
         input_file: Path to the input audio/video file
         visit_id: Visit ID for logging purposes
@@ -50,13 +185,23 @@ def convert_to_wav_with_ffmpeg(input_file: str, visit_id: str) -> str:
         )
 
         # FFmpeg command to convert to WAV with specific parameters
+        # -nostdin/-hide_banner/-loglevel error/-nostats: no console
+        #  interaction, errors only on stderr, no periodic progress lines
+        # -threads 0: let FFmpeg use all available cores
         # -i: input file
         # -acodec pcm_s16le: use 16-bit PCM encoding
         # -ar 16000: set sample rate to 16kHz (optimal for Whisper)
         # -ac 1: convert to mono
         # -y: overwrite output file if it exists
         ffmpeg_cmd = [
-            "ffmpeg",
+            _FFMPEG_PATH,
+            "-nostdin",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-nostats",
+            "-threads",
+            "0",
             "-i",
             input_file,
             "-acodec",
@@ -69,16 +214,28 @@ def convert_to_wav_with_ffmpeg(input_file: str, visit_id: str) -> str:
             output_path,
         ]
 
-        # Run FFmpeg conversion
-        result = subprocess.run(
-            ffmpeg_cmd,
-            capture_output=True,
-            text=True,
-            timeout=300,  # 5 minute timeout
+        # Run FFmpeg conversion without blocking the event loop. stdout is
+        # discarded outright; stderr carries errors only (-loglevel error
+        # -nostats) so the buffered bytes stay tiny and are decoded solely
+        # on failure
+        proc = await asyncio.create_subprocess_exec(
+            *ffmpeg_cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
         )
+        try:
+            _, stderr = await asyncio.wait_for(
+                proc.communicate(), timeout=FFMPEG_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(ffmpeg_cmd, FFMPEG_TIMEOUT)
 
-        if result.returncode != 0:
-            raise Exception(f"FFmpeg conversion failed: {result.stderr}")
+        if proc.returncode != 0:
+            raise Exception(
+                f"FFmpeg conversion failed: {stderr.decode('utf-8', 'replace')}"
+            )
 
         # Verify the output file was created and has content
         if not os.path.exists(output_path):
@@ -2,6 +2,79 @@
 
 import re
 
+# All cleanup patterns are compiled once at module load and stored as
+# (compiled pattern, replacement) tuples, so the per-call cost is just the
+# substitutions themselves — no re-compilation or re._compile cache lookups
+# on the formatting hot path.
+
+# General cleanup applied to every section before section-specific fixes
+_GENERAL_PRE_PATTERNS = (
+    (re.compile(r"\\+$"), ""),  # Remove trailing backslashes
+    (re.compile(r"\\+\s*\n"), "\n"),  # Remove backslashes at end of lines
+    (re.compile(r":\\\s*\n"), ":\n"),  # Fix ":\\" patterns
+    # Fix section headers with backslashes
+    (re.compile(r"#\s*([A-Za-z]+):\\\s*"), r"# \1:\n"),
+)
+
+# Fix numbering and ICD-10 code issues in the Assessment section. Related
+# fixes are merged into single alternation patterns so each one is a single
+# O(N) scan of the content instead of one scan per variant.
+_ASSESSMENT_PATTERNS = (
+    # Fix malformed numbering like "1.\*", "1.*", or "1\."
+    (re.compile(r"(\d+)(?:\.\\?\*|\\\.)\s*"), r"\1. "),
+    # Fix ICD-10 code mangling (wrong revision, letter O instead of zero)
+    (re.compile(r"(?:ICDS-11|ICDC-1o|ICD-1O):"), "ICD-10:"),
+)
+
+# Fix bullet point and header inconsistencies in the Plan section
+_PLAN_PATTERNS = (
+    (re.compile(r"^\s*\*\s*", re.MULTILINE), "- "),
+    (re.compile(r"^\s*\+\s*", re.MULTILINE), "  - "),
+    (re.compile(r"^###\s*", re.MULTILINE), "## "),
+    (re.compile(r"^####\s*", re.MULTILINE), "### "),
+)
+
+# Ensure proper bullet point format in the Objective section
+_OBJECTIVE_PATTERNS = (
+    (re.compile(r"^-\s*([A-Za-z])", re.MULTILINE), r"- \1"),
+)
+
+# Remove disclaimers and fix header placement in the Subjective section
+_SUBJECTIVE_PATTERNS = (
+    # All explanatory-note/disclaimer variants in one alternation pass
+    (
+        re.compile(
+            r"\((?:Note:.*?based on.*?|This summary is based on.*?|Based on.*?information.*?)\.\)\s*",
+            re.IGNORECASE | re.DOTALL,
+        ),
+        "",
+    ),
+    # Ensure header and content are on separate lines
+    (re.compile(r"^#\s*Subjective:\s*(.+)", re.MULTILINE), r"# Subjective:\n\1"),
+    # Also handle cases where there's no space after the colon
+    (re.compile(r"^#\s*Subjective:([^\n])", re.MULTILINE), r"# Subjective:\n\1"),
+)
+
+# General cleanup applied to every section after section-specific fixes
+_GENERAL_POST_PATTERNS = (
+    (re.compile(r"\s+\n"), "\n"),  # Remove trailing whitespace
+    (re.compile(r"\n{3,}"), "\n\n"),  # Reduce multiple newlines
+)
+
+_SECTION_PATTERNS = {
+    "assessment": _ASSESSMENT_PATTERNS,
+    "plan": _PLAN_PATTERNS,
+    "objective": _OBJECTIVE_PATTERNS,
+    "subjective": _SUBJECTIVE_PATTERNS,
+}
+
+
+def _apply_patterns(content: str, patterns: tuple) -> str:
+    """Apply a list of (compiled pattern, replacement) substitutions."""
+    for pattern, replacement in patterns:
+        content = pattern.sub(replacement, content)
+    return content
+
 
 def clean_soap_formatting(content: str, section_name: str) -> str:
     """
@@ -12,83 +85,13 @@ def clean_soap_formatting(content: str, section_name: str) -> str:
         section_name: Name of the section (subjective, objective, assessment, plan)
 
     Returns:
-        str: Cleaned contesnt
+        str: Cleaned content
     """
-    # Remove trailing backslashes and fix common formatting issues
-    content = re.sub(r"\\+$", "", content)  # Remove trailing backslashes
-    content = re.sub(r"\\+\s*\n", "\n", content)  # Remove backslashes at end of lines
-    content = re.sub(r":\\\s*\n", ":\n", content)  # Fix ":\\" patterns
-    content = re.sub(
-        r"#\s*([A-Za-z]+):\\\s*", r"# \1:\n", content
-    )  # Fix section headers with backslashes
-
-    # Fix numbering issues in Assessment section
-    if section_name.lower() == "assessment":
-        # Fix malformed numbering like "1.\*" or "1.*"
-        content = re.sub(r"(\d+)\.\\\*\s*", r"\1. ", content)
-        content = re.sub(r"(\d+)\.\*\s*", r"\1. ", content)
-        content = re.sub(r"(\d+)\\\.\s*", r"\1. ", content)
-
-        # Fix ICD-10 code formatting issues
-        content = re.sub(r"ICDS-11:", "ICD-10:", content)
-        content = re.sub(r"ICDC-1o:", "ICD-10:", content)
-        content = re.sub(r"ICD-1O:", "ICD-10:", content)  # Fix O instead of 0
-
-    # Fix Plan section formatting
-    if section_name.lower() == "plan":
-        # Fix bullet point inconsistencies
-        content = re.sub(r"^\s*\*\s*", "- ", content, flags=re.MULTILINE)
-        content = re.sub(r"^\s*\+\s*", "  - ", content, flags=re.MULTILINE)
-
-        # Fix section headers
-        content = re.sub(r"^###\s*", "## ", content, flags=re.MULTILINE)
-        content = re.sub(r"^####\s*", "### ", content, flags=re.MULTILINE)
-
-    # Fix Objective section formatting
-    if section_name.lower() == "objective":
-        # Ensure proper bullet point format
-        content = re.sub(r"^-\s*([A-Za-z])", r"- \1", content, flags=re.MULTILINE)
-
-    # Fix Subjective section formatting
-    if section_name.lower() == "subjective":
-        # Remove unwanted explanatory notes and disclaimers
-        content = re.sub(
-            r"\(Note:.*?based on.*?\.\)\s*",
-            "",
-            content,
-            flags=re.IGNORECASE | re.DOTALL,
-        )
-        content = re.sub(
-            r"\(This summary is based on.*?\.\)\s*",
-            "",
-            content,
-            flags=re.IGNORECASE | re.DOTALL,
-        )
-        content = re.sub(
-            r"\(Based on.*?information.*?\.\)\s*",
-            "",
-            content,
-            flags=re.IGNORECASE | re.DOTALL,
-        )
-
-        # Ensure header and content are on separate lines
-        content = re.sub(
-            r"^#\s*Subjective:\s*(.+)",
-            r"# Subjective:\n\1",
-            content,
-            flags=re.MULTILINE,
-        )
-        # Also handle cases where there's no space after the colon
-        content = re.sub(
-            r"^#\s*Subjective:([^\n])",
-            r"# Subjective:\n\1",
-            content,
-            flags=re.MULTILINE,
-        )
-
-    # General cleanup
-    content = re.sub(r"\s+\n", "\n", content)  # Remove trailing whitespace
-    content = re.sub(r"\n{3,}", "\n\n", content)  # Reduce multiple newlines
-    content = content.strip()
+    content = _apply_patterns(content, _GENERAL_PRE_PATTERNS)
 
-    return content
+    section_patterns = _SECTION_PATTERNS.get(section_name.lower())
+    if section_patterns is not None:
+        content = _apply_patterns(content, section_patterns)
+
+    content = _apply_patterns(content, _GENERAL_POST_PATTERNS)
+    return content.strip()
@@ -14,7 +14,23 @@ def remove_overlap(prev_text: str, curr_text: str, max_overlap_chars: int = 80)
         str: Current text with overlap removed
     """
     max_overlap_chars = min(max_overlap_chars, len(prev_text), len(curr_text))
-    for i in range(max_overlap_chars, 0, -1):
-        if prev_text[-i:] == curr_text[:i]:
-            return curr_text[i:]
-    return curr_text
+    if max_overlap_chars == 0:
+        return curr_text
+
+    # The longest k where prev_text ends with curr_text's first k characters
+    # is the final value of the KMP failure function over
+    # "curr_prefix + sentinel + prev_suffix" — one O(window) pass instead of
+    # a slice-and-compare probe per candidate length. The sentinel cannot
+    # occur in text, so matches never straddle the boundary.
+    window = (
+        curr_text[:max_overlap_chars] + "\x00" + prev_text[-max_overlap_chars:]
+    )
+    fail = [0] * len(window)
+    k = 0
+    for i in range(1, len(window)):
+        while k and window[i] != window[k]:
+            k = fail[k - 1]
+        if window[i] == window[k]:
+            k += 1
+        fail[i] = k
+    return curr_text[fail[-1]:]
@@ -1,10 +1,10 @@
 """Audio processing pipeline service."""
 
-import asyncio
+import time
 from services.transcription import transcribe_audio
 from services.soap_generator import generate_soap_note
 from utils.logger import logger
-from utils.storage import visits_store
+from utils.storage import visits_store, update_visit, processed_hashes
 
 
 async def process_audio_file(audio_file_path: str, visit_id: str):
@@ -16,13 +16,12 @@ async def process_audio_file(audio_file_path: str, visit_id: str):
         audio_file_path: Path to the audio file
         visit_id: Visit ID for tracking
     """
-    if visit_id not in visits_store:
+    if visits_store.get(visit_id) is None:
         return
 
     try:
         # Update status to processing
-        visits_store[visit_id]["status"] = "processing"
-        visits_store[visit_id]["progress"] = 0
+        update_visit(visit_id, status="processing", progress=0)
         logger.info(
             f"Visit {visit_id}: Starting audio processing pipeline for file: {audio_file_path}"
         )
@@ -33,19 +32,19 @@ async def process_audio_file(audio_file_path: str, visit_id: str):
         if not transcript:
             raise Exception("Transcription produced empty result")
 
-        # Store transcript for reference
-        visits_store[visit_id]["transcript"] = transcript
+        # Transcript is already stored (and persisted) by transcribe_audio
+        # together with the extracting_text status update
         logger.info(
             f"Visit {visit_id}: Transcript stored with {len(transcript)} characters"
         )
 
         # Step 2: Generate SOAP note using Mistral
         logger.info(f"Visit {visit_id}: Starting SOAP note generation with Mistral LLM")
-        llm_start_time = asyncio.get_event_loop().time()
+        llm_start_time = time.perf_counter()
 
         soap_note = await generate_soap_note(transcript, visit_id)
 
-        llm_end_time = asyncio.get_event_loop().time()
+        llm_end_time = time.perf_counter()
         llm_duration = llm_end_time - llm_start_time
         logger.info(
             f"Visit {visit_id}: LLM generation completed in {llm_duration:.2f} seconds"
@@ -55,20 +54,27 @@ async def process_audio_file(audio_file_path: str, visit_id: str):
             raise Exception("SOAP note generation produced empty result")
 
         # Final completion
-        visits_store[visit_id]["status"] = "finalizing"
-        visits_store[visit_id]["progress"] = 95
+        update_visit(visit_id, status="finalizing", progress=95)
         logger.info(f"Visit {visit_id}: Finalizing processing")
 
-        visits_store[visit_id]["status"] = "completed"
-        visits_store[visit_id]["progress"] = 100
-        visits_store[visit_id]["soap_note"] = soap_note
-        visits_store[visit_id]["generation_time"] = llm_duration
+        update_visit(
+            visit_id,
+            status="completed",
+            progress=100,
+            soap_note=soap_note,
+            generation_time=llm_duration,
+        )
+
+        # Remember the upload's content hash so identical re-uploads can
+        # reuse this visit's completed result
+        digest = visits_store.get(visit_id, {}).get("audio_sha256")
+        if digest:
+            processed_hashes[digest] = visit_id
 
         logger.info(f"Visit {visit_id}: Processing completed successfully")
 
     except Exception as e:
-        visits_store[visit_id]["status"] = "error"
-        visits_store[visit_id]["error"] = str(e)
+        update_visit(visit_id, status="error", error=str(e))
         logger.error(f"Visit {visit_id}: Processing failed - {str(e)}")
 
     logger.info(f"Visit {visit_id}: Audio processing pipeline finished")
@@ -0,0 +1,103 @@
+"""Optional vLLM-backed LLM serving engine."""
+
+from configs.settings import (
+    LLM_MODEL_NAME,
+    LLM_BACKEND,
+    LLM_MAX_MODEL_LEN,
+    LLM_GPU_MEMORY_UTILIZATION,
+    LLM_QUANTIZATION,
+    LLM_SPECULATIVE_DRAFT_MODEL,
+    LLM_NUM_SPECULATIVE_TOKENS,
+)
+from utils.logger import logger
+
+try:
+    from vllm import AsyncEngineArgs, AsyncLLMEngine, SamplingParams
+
+    VLLM_AVAILABLE = True
+except ImportError:
+    VLLM_AVAILABLE = False
+
+# Lazily-initialized engine and tokenizer singletons
+_engine = None
+_tokenizer = None
+
+
+def vllm_enabled() -> bool:
+    """Return True when the vLLM backend is selected and importable."""
+    return LLM_BACKEND == "vllm" and VLLM_AVAILABLE
+
+
+def get_engine():
+    """Lazily create and return the shared AsyncLLMEngine instance."""
+    global _engine
+    if _engine is None:
+        logger.info(f"Initializing vLLM engine for {LLM_MODEL_NAME}")
+        engine_args = AsyncEngineArgs(
+            model=LLM_MODEL_NAME,
+            enable_prefix_caching=True,
+            max_model_len=LLM_MAX_MODEL_LEN,
+            gpu_memory_utilization=LLM_GPU_MEMORY_UTILIZATION,
+        )
+        if LLM_QUANTIZATION:
+            engine_args.quantization = LLM_QUANTIZATION
+            logger.info(f"vLLM engine using {LLM_QUANTIZATION} quantized weights")
+        if LLM_SPECULATIVE_DRAFT_MODEL:
+            engine_args.speculative_config = {
+                "model": LLM_SPECULATIVE_DRAFT_MODEL,
+                "num_speculative_tokens": LLM_NUM_SPECULATIVE_TOKENS,
+            }
+            logger.info(
+                f"vLLM engine using speculative decoding with draft model {LLM_SPECULATIVE_DRAFT_MODEL}"
+            )
+        _engine = AsyncLLMEngine.from_engine_args(engine_args)
+        logger.info("vLLM engine initialized")
+    return _engine
+
+
+def _get_tokenizer():
+    """Lazily load the tokenizer used for chat-template rendering."""
+    global _tokenizer
+    if _tokenizer is None:
+        from transformers import AutoTokenizer
+
+        _tokenizer = AutoTokenizer.from_pretrained(LLM_MODEL_NAME)
+    return _tokenizer
+
+
+async def generate_with_vllm(
+    chat_messages: list, max_new_tokens: int, request_id: str
+) -> str:
+    """
+    Generate a chat response through the shared vLLM continuous batch.
+
+    Args:
+        chat_messages: List of chat messages
+        max_new_tokens: Maximum number of tokens to generate
+        request_id: Unique ID for this generation request
+
+    Returns:
+        str: Generated response text
+    """
+    prompt = _get_tokenizer().apply_chat_template(
+        chat_messages, add_generation_prompt=True, tokenize=False
+    )
+    sampling_params = SamplingParams(
+        max_tokens=max_new_tokens,
+        temperature=0.6,
+        top_p=0.9,
+        top_k=50,
+        repetition_penalty=1.15,
+    )
+
+    final_output = None
+    async for output in get_engine().generate(
+        prompt, sampling_params, request_id=request_id
+    ):
+        final_output = output
+
+    text = final_output.outputs[0].text.strip()
+    logger.info(
+        f"[LLM] vLLM generation completed. Response length: {len(text)} characters"
+    )
+    return text
@@ -1,17 +1,280 @@
 """LLM service for chat response generation."""
 
+import sys
+import uuid
+import asyncio
 import torch
 import threading
+from functools import lru_cache
 from transformers import TextIteratorStreamer
-from configs.settings import LLM_MAX_TOKENS, SOAP_SECTION_MAX_TOKENS
+from configs.prompts import TRANSCRIPT_USER_PREFIX
+from configs.settings import (
+    LLM_MAX_TOKENS,
+    SOAP_SECTION_MAX_TOKENS,
+    LLM_STREAM_TO_CONSOLE,
+)
 from utils.logger import logger
+from services import llm_engine
 from services.model_manager import model_manager
 
+# Sentinel used to locate the dynamic transcript inside the rendered template
+_TRANSCRIPT_SENTINEL = "\x00TRANSCRIPT\x00"
+
+# When console streaming is enabled, flush accumulated tokens this often
+_CONSOLE_FLUSH_TOKENS = 50
+
+
+@lru_cache(maxsize=None)
+def _section_prompt_static_ids(section_prompt: str):
+    """
+    Tokenize the static parts of a section prompt's chat template once.
+
+    Renders the chat template with a sentinel in place of the transcript,
+    splits around it, and tokenizes the static prefix (system prompt + user
+    preamble) and suffix (template closing tokens) separately. Cached per
+    prompt string so repeat calls skip re-tokenizing ~600 words of
+    boilerplate; only the transcript is tokenized per call.
+
+    Returns:
+        tuple: (prefix input_ids, suffix input_ids) as [1, N] tensors
+    """
+    tokenizer = model_manager.llm_tokenizer
+    rendered = tokenizer.apply_chat_template(
+        [
+            {"role": "system", "content": section_prompt},
+            {
+                "role": "user",
+                "content": TRANSCRIPT_USER_PREFIX + _TRANSCRIPT_SENTINEL,
+            },
+        ],
+        add_generation_prompt=True,
+        tokenize=False,
+    )
+    prefix_text, suffix_text = rendered.split(_TRANSCRIPT_SENTINEL)
+    prefix_ids = tokenizer(
+        prefix_text, return_tensors="pt", add_special_tokens=False
+    ).input_ids
+    suffix_ids = tokenizer(
+        suffix_text, return_tensors="pt", add_special_tokens=False
+    ).input_ids
+    return prefix_ids, suffix_ids
+
+
+@lru_cache(maxsize=8)
+def _transcript_ids(transcript: str):
+    """
+    Tokenize a transcript once per distinct text.
+
+    The same transcript is injected into all four section prompts (and into
+    retries), so caching the token ids collapses four tokenizations of the
+    longest input into one.
+
+    Returns:
+        Transcript input_ids as a [1, N] tensor
+    """
+    return model_manager.llm_tokenizer(
+        transcript, return_tensors="pt", add_special_tokens=False
+    ).input_ids
+
+
+def build_section_inputs(section_prompt: str, transcript: str) -> dict:
+    """
+    Build model inputs for a section call from cached static prompt ids.
+
+    Args:
+        section_prompt: The system prompt for this section
+        transcript: The conversation transcript
+
+    Returns:
+        dict: input_ids and attention_mask tensors ready for generate()
+    """
+    prefix_ids, suffix_ids = _section_prompt_static_ids(section_prompt)
+    transcript_ids = _transcript_ids(transcript)
+    input_ids = torch.cat([prefix_ids, transcript_ids, suffix_ids], dim=1)
+    return {
+        "input_ids": input_ids,
+        "attention_mask": torch.ones_like(input_ids),
+    }
+
+
+async def generate_section_response(
+    section_prompt: str,
+    transcript: str,
+    max_new_tokens: int = SOAP_SECTION_MAX_TOKENS,
+) -> str:
+    """
+    Generate a SOAP section (or combined note) response for a transcript.
+
+    On the transformers path the static prompt prefix/suffix token ids are
+    reused from the import-time cache, so only the transcript is tokenized
+    per call.
+
+    Args:
+        section_prompt: The system prompt for this section
+        transcript: The conversation transcript
+        max_new_tokens: Maximum number of tokens to generate
+
+    Returns:
+        str: Generated response text
+    """
+    messages = [
+        {"role": "system", "content": section_prompt},
+        {"role": "user", "content": TRANSCRIPT_USER_PREFIX + transcript},
+    ]
+
+    if llm_engine.vllm_enabled():
+        return await llm_engine.generate_with_vllm(
+            messages, max_new_tokens, request_id=str(uuid.uuid4())
+        )
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None,
+        lambda: generate_chat_response_sync(
+            messages,
+            max_new_tokens=max_new_tokens,
+            section_mode=True,
+            inputs=build_section_inputs(section_prompt, transcript),
+        ),
+    )
+
+
+async def generate_section_responses_batched(
+    section_prompts: list,
+    transcript: str,
+    max_new_tokens: int = SOAP_SECTION_MAX_TOKENS,
+) -> list:
+    """
+    Generate several SOAP sections for one transcript in a single batch.
+
+    All prompts are decoded in one left-padded model.generate call, so the
+    transcript prefill and kernel launch overhead are amortized across the
+    batch instead of paid once per section.
+
+    Args:
+        section_prompts: System prompts, one per section
+        transcript: The conversation transcript shared by all sections
+        max_new_tokens: Maximum number of tokens to generate per section
+
+    Returns:
+        list: Generated response texts, in section_prompts order
+    """
+    inputs_list = [
+        build_section_inputs(section_prompt, transcript)
+        for section_prompt in section_prompts
+    ]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None,
+        lambda: generate_chat_responses_batched(inputs_list, max_new_tokens),
+    )
+
+
+def generate_chat_responses_batched(inputs_list: list, max_new_tokens: int) -> list:
+    """
+    Run one batched generate over several pre-tokenized prompts.
+
+    Prompts are left-padded to a common length so every generated
+    continuation starts immediately after its own prompt.
+
+    Args:
+        inputs_list: Per-prompt dicts of input_ids/attention_mask tensors
+        max_new_tokens: Maximum number of tokens to generate per prompt
+
+    Returns:
+        list: Decoded response texts, in inputs_list order
+    """
+    with model_manager.generation_lock:
+        tokenizer = model_manager.llm_tokenizer
+        pad_token_id = tokenizer.pad_token_id
+        if pad_token_id is None:
+            pad_token_id = tokenizer.eos_token_id
+
+        logger.info(f"[LLM] Starting batched generation for {len(inputs_list)} prompts")
+
+        max_len = max(item["input_ids"].shape[1] for item in inputs_list)
+        input_rows = []
+        mask_rows = []
+        for item in inputs_list:
+            input_ids = item["input_ids"]
+            pad_len = max_len - input_ids.shape[1]
+            input_rows.append(
+                torch.cat(
+                    [
+                        torch.full((1, pad_len), pad_token_id, dtype=input_ids.dtype),
+                        input_ids,
+                    ],
+                    dim=1,
+                )
+            )
+            mask_rows.append(
+                torch.cat(
+                    [
+                        torch.zeros((1, pad_len), dtype=torch.long),
+                        torch.ones_like(input_ids),
+                    ],
+                    dim=1,
+                )
+            )
+        batched_input_ids = torch.cat(input_rows).to(model_manager.device)
+        batched_attention_mask = torch.cat(mask_rows).to(model_manager.device)
+
+        # Sampling parameters come from the generation_config pinned at load
+        with torch.inference_mode():
+            output_ids = model_manager.llm_model.generate(
+                input_ids=batched_input_ids,
+                attention_mask=batched_attention_mask,
+                max_new_tokens=max_new_tokens,
+            )
+
+        texts = tokenizer.batch_decode(
+            output_ids[:, batched_input_ids.shape[1]:], skip_special_tokens=True
+        )
+        logger.info(
+            f"[LLM] Batched generation completed for {len(texts)} prompts"
+        )
+        return [text.strip() for text in texts]
+
+
+async def generate_chat_response(
+    chat_messages: list,
+    max_new_tokens: int = LLM_MAX_TOKENS,
+    section_mode: bool = False,
+) -> str:
+    """
+    Async chat response generation, routed to the configured backend.
+
+    With the vLLM backend, concurrent calls (all sections and all visits)
+    coalesce into one continuous batch; otherwise the in-process transformers
+    path runs in a thread executor to avoid blocking the event loop.
+
+    Args:
+        chat_messages: List of chat messages
+        max_new_tokens: Maximum number of tokens to generate
+        section_mode: Whether generating a SOAP section (uses different params)
+
+    Returns:
+        str: Generated response text
+    """
+    if llm_engine.vllm_enabled():
+        return await llm_engine.generate_with_vllm(
+            chat_messages, max_new_tokens, request_id=str(uuid.uuid4())
+        )
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None,
+        lambda: generate_chat_response_sync(
+            chat_messages, max_new_tokens=max_new_tokens, section_mode=section_mode
+        ),
+    )
+
 
 def generate_chat_response_sync(
     chat_messages: list,
     max_new_tokens: int = LLM_MAX_TOKENS,
     section_mode: bool = False,
+    inputs: dict = None,
 ) -> str:
     """
     Synchronous chat response generation with streaming to console.
@@ -20,6 +283,8 @@ def generate_chat_response_sync(
         chat_messages: List of chat messages
         max_new_tokens: Maximum number of tokens to generate
         section_mode: Whether generating a SOAP section (uses different params)
+        inputs: Pre-tokenized model inputs; when given, skips chat-template
+                tokenization of chat_messages
 
     Returns:
         str: Generated response text
@@ -29,18 +294,38 @@ def generate_chat_response_sync(
             f"[LLM] Received messages: {len(chat_messages)} messages, section_mode: {section_mode}"
         )
 
-        # Format and tokenize the input
-        inputs = model_manager.llm_tokenizer.apply_chat_template(
-            chat_messages,
-            add_generation_prompt=True,
-            return_dict=True,
-            return_tensors="pt",
-        )
-        inputs = inputs.to(model_manager.device)
+        # Format and tokenize the input unless pre-tokenized ids were supplied
+        if inputs is None:
+            inputs = model_manager.llm_tokenizer.apply_chat_template(
+                chat_messages,
+                add_generation_prompt=True,
+                return_dict=True,
+                return_tensors="pt",
+            )
+            inputs = inputs.to(model_manager.device)
+        else:
+            inputs = {k: v.to(model_manager.device) for k, v in inputs.items()}
 
         mode_desc = "section generation" if section_mode else "general generation"
         logger.info(f"[LLM] Starting {mode_desc} with improved parameters")
 
+        # Nothing consumes tokens incrementally unless console streaming is
+        # enabled, so generate inline: no streamer thread, no per-token
+        # queue hand-off, no incremental decode
+        if not LLM_STREAM_TO_CONSOLE:
+            with torch.inference_mode():
+                output_ids = model_manager.llm_model.generate(
+                    **inputs, max_new_tokens=max_new_tokens
+                )
+            text = model_manager.llm_tokenizer.decode(
+                output_ids[0][inputs["input_ids"].shape[1]:],
+                skip_special_tokens=True,
+            ).strip()
+            logger.info(
+                f"[LLM] Generation completed. Response length: {len(text)} characters"
+            )
+            return text
+
         # Set up streamer for console output
         streamer = TextIteratorStreamer(
             model_manager.llm_tokenizer,
@@ -48,29 +333,18 @@ def generate_chat_response_sync(
             skip_special_tokens=True,
         )
 
-        # Clear cache before generation
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-        elif hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
-            torch.mps.empty_cache()
-
         generated_tokens = []
 
         def run_generation():
             """Run the actual generation in a separate thread."""
             try:
-                with torch.no_grad():
+                # Sampling parameters come from the generation_config
+                # pinned at load
+                with torch.inference_mode():
                     _ = model_manager.llm_model.generate(
                         **inputs,
                         max_new_tokens=max_new_tokens,
-                        do_sample=True,
-                        temperature=0.6,
-                        top_p=0.9,
-                        top_k=50,
-                        repetition_penalty=1.15,
                         streamer=streamer,
-                        pad_token_id=model_manager.llm_tokenizer.pad_token_id,
-                        eos_token_id=model_manager.llm_tokenizer.eos_token_id,
                     )
             except Exception as e:
                 logger.error(f"[LLM] Generation error: {str(e)}")
@@ -80,25 +354,34 @@ def generate_chat_response_sync(
         generation_thread = threading.Thread(target=run_generation)
         generation_thread.start()
 
-        # Collect tokens and print them to console as they arrive
-        print("[LLM STREAMING] Starting token generation:")
+        # Collect tokens as they arrive. Console echo is opt-in and flushed
+        # in batches, so a 512-token section costs a handful of write
+        # syscalls instead of one per token
+        if LLM_STREAM_TO_CONSOLE:
+            print("[LLM STREAMING] Starting token generation:")
 
+        flushed = 0
         for piece in streamer:
             generated_tokens.append(piece)
-            print(piece, end="", flush=True)
+            if (
+                LLM_STREAM_TO_CONSOLE
+                and len(generated_tokens) - flushed >= _CONSOLE_FLUSH_TOKENS
+            ):
+                sys.stdout.write("".join(generated_tokens[flushed:]))
+                sys.stdout.flush()
+                flushed = len(generated_tokens)
 
-        print()  # Add newline after streaming is complete
+        if LLM_STREAM_TO_CONSOLE:
+            sys.stdout.write("".join(generated_tokens[flushed:]) + "\n")
+            sys.stdout.flush()
         generation_thread.join()
 
-        # Combine all generated tokens
+        # Combine all generated tokens. No empty_cache here: it forces a
+        # device sync and returns blocks to the driver, so the next call
+        # pays cudaMalloc again instead of reusing the caching allocator.
+        # cleanup_resources still empties the cache once at shutdown.
         text = "".join(generated_tokens).strip()
 
-        # Clear any potential caches after generation
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-        elif hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
-            torch.mps.empty_cache()
-
         logger.info(
             f"[LLM] Generation completed. Response length: {len(text)} characters"
         )
@@ -1,17 +1,99 @@
 """SOAP note generation service."""
 
+import re
 import asyncio
 from configs.prompts import (
     SOAP_SUBJECTIVE_PROMPT,
     SOAP_OBJECTIVE_PROMPT,
     SOAP_ASSESSMENT_PROMPT,
     SOAP_PLAN_PROMPT,
+    SOAP_COMBINED_PROMPT,
+)
+from configs.settings import (
+    LLM_MAX_TOKENS,
+    SOAP_SECTION_MAX_TOKENS,
+    SOAP_SHORT_TRANSCRIPT_CHARS,
 )
-from configs.settings import SOAP_SECTION_MAX_TOKENS
 from helpers.soap_formatter import clean_soap_formatting
-from services.llm_service import generate_chat_response_sync
+from services import llm_engine
+from services.llm_service import (
+    generate_section_response,
+    generate_section_responses_batched,
+)
 from utils.logger import logger
-from utils.storage import visits_store
+from utils.storage import visits_store, update_visit, remove_visit_fields
+
+# Section order expected in the combined-generation output
+SOAP_SECTION_NAMES = ["Subjective", "Objective", "Assessment", "Plan"]
+
+# Matches the markdown section headers emitted by the combined prompt
+_SECTION_HEADER_PATTERN = re.compile(
+    r"^#\s*(Subjective|Objective|Assessment|Plan):", re.MULTILINE
+)
+
+
+# Cheap evidence prechecks for short transcripts: if a section's prompt has a
+# known canned answer and the transcript shows no matching evidence, return the
+# canned text instead of decoding ~800 tokens to produce it
+_SECTION_EVIDENCE_PATTERNS = {
+    "Objective": re.compile(
+        r"\b(BP|HR|temp|vital|exam|blood pressure|heart rate|mmHg|mg/dL)\b|°F",
+        re.IGNORECASE,
+    ),
+    "Assessment": re.compile(
+        r"\b(diagnos\w*|symptom\w*|pain|condition|disease|disorder|infection|injur\w*)\b",
+        re.IGNORECASE,
+    ),
+    "Plan": re.compile(
+        r"\b(take|prescri\w*|follow[- ]?up|refer\w*|medicat\w*|treat\w*|recommend\w*|schedule\w*|monitor\w*)\b",
+        re.IGNORECASE,
+    ),
+}
+
+_SECTION_CANNED_OUTPUTS = {
+    "Objective": "# Objective:\n- No objective findings documented in the provided transcript",
+    "Assessment": "# Assessment:\n1. No diagnosis-supporting information documented in the provided transcript",
+    "Plan": "# Plan:\n- No plan items documented in the provided transcript",
+}
+
+
+def get_canned_section(transcript: str, section_name: str):
+    """
+    Return the canned section output when the transcript trivially lacks
+    evidence for this section, or None when generation is needed.
+    """
+    if len(transcript) >= SOAP_SHORT_TRANSCRIPT_CHARS:
+        return None
+    pattern = _SECTION_EVIDENCE_PATTERNS.get(section_name)
+    if pattern is None or pattern.search(transcript):
+        return None
+    return _SECTION_CANNED_OUTPUTS[section_name]
+
+
+def split_combined_soap_note(combined_output: str) -> dict:
+    """
+    Split a combined SOAP generation into its four sections by markdown header.
+
+    Args:
+        combined_output: Raw LLM output containing all four sections
+
+    Returns:
+        dict: Mapping of section name to section content (including its header).
+              May contain fewer than four entries if the model deviated from
+              the requested format.
+    """
+    sections = {}
+    matches = list(_SECTION_HEADER_PATTERN.finditer(combined_output))
+
+    for i, match in enumerate(matches):
+        section_name = match.group(1)
+        start = match.start()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(combined_output)
+        # Keep the first occurrence if the model repeats a header
+        if section_name not in sections:
+            sections[section_name] = combined_output[start:end].strip()
+
+    return sections
 
 
 async def generate_soap_section(
@@ -35,24 +117,17 @@ async def generate_soap_section(
     try:
         logger.info(f"Visit {visit_id}: Starting {section_name} section generation")
 
-        # Prepare the messages for this specific section
-        messages = [
-            {"role": "system", "content": section_prompt},
-            {
-                "role": "user",
-                "content": f"Here is the verbatim transcript of the doctor-patient encounter:\n\n{transcript}",
-            },
-        ]
-
-        # Run generation in executor to avoid blocking the event loop
-        loop = asyncio.get_running_loop()
+        # Short-circuit sections whose canned answer is already known
+        canned = get_canned_section(transcript, section_name)
+        if canned is not None:
+            logger.info(
+                f"Visit {visit_id}: {section_name} section short-circuited - no evidence in short transcript"
+            )
+            return canned
 
         # Use more conservative parameters for SOAP sections
-        section_content = await loop.run_in_executor(
-            None,
-            lambda: generate_chat_response_sync(
-                messages, max_new_tokens=SOAP_SECTION_MAX_TOKENS, section_mode=True
-            ),
+        section_content = await generate_section_response(
+            section_prompt, transcript, max_new_tokens=SOAP_SECTION_MAX_TOKENS
         )
 
         # Clean up common formatting issues
@@ -71,9 +146,52 @@ async def generate_soap_section(
         raise Exception(f"{section_name} section generation failed: {str(e)}")
 
 
+async def generate_combined_soap_note(transcript: str, visit_id: str) -> str:
+    """
+    Generate all four SOAP sections in a single LLM call.
+
+    The transcript is prefilled once and the KV cache is shared across
+    sections, instead of paying four separate prefill + decode startups.
+
+    Args:
+        transcript: The conversation transcript
+        visit_id: Visit ID for tracking
+
+    Returns:
+        str: Complete SOAP note
+
+    Raises:
+        Exception: If the combined output is missing any of the four sections
+    """
+    logger.info(f"Visit {visit_id}: Starting combined SOAP note generation")
+
+    combined_output = await generate_section_response(
+        SOAP_COMBINED_PROMPT, transcript, max_new_tokens=LLM_MAX_TOKENS
+    )
+
+    sections = split_combined_soap_note(combined_output)
+    missing = [name for name in SOAP_SECTION_NAMES if name not in sections]
+    if missing:
+        raise Exception(
+            f"Combined generation output missing sections: {', '.join(missing)}"
+        )
+
+    # Clean each section with the same per-section formatting fixups
+    cleaned_sections = [
+        clean_soap_formatting(sections[name], name) for name in SOAP_SECTION_NAMES
+    ]
+
+    full_soap_note = "\n\n".join(cleaned_sections)
+    logger.info(
+        f"Visit {visit_id}: Combined SOAP note generation completed. Total length: {len(full_soap_note)} characters"
+    )
+    return full_soap_note
+
+
 async def generate_soap_note(transcript: str, visit_id: str) -> str:
     """
-    Generate SOAP note using agentic approach - section by section.
+    Generate SOAP note with a single combined LLM call, falling back to
+    section-by-section generation if the combined output is malformed.
 
     Args:
         transcript: The conversation transcript
@@ -86,13 +204,27 @@ async def generate_soap_note(transcript: str, visit_id: str) -> str:
         Exception: If SOAP note generation fails
     """
     try:
-        visits_store[visit_id]["status"] = "generating_soap"
-        visits_store[visit_id]["progress"] = 50
+        update_visit(visit_id, status="generating_soap", progress=50)
         logger.info(
-            f"Visit {visit_id}: Starting agentic SOAP note generation with transcript length: {len(transcript)} characters"
+            f"Visit {visit_id}: Starting SOAP note generation with transcript length: {len(transcript)} characters"
         )
 
-        # Define the sections and their prompts
+        # Fast path: one generate() call prefills the transcript once and
+        # produces all four sections together. Short transcripts go straight
+        # to the per-section path so the canned-section short-circuits apply.
+        if len(transcript) >= SOAP_SHORT_TRANSCRIPT_CHARS:
+            try:
+                full_soap_note = await generate_combined_soap_note(
+                    transcript, visit_id
+                )
+                update_visit(visit_id, progress=90)
+                return full_soap_note.strip()
+            except Exception as combined_error:
+                logger.warning(
+                    f"Visit {visit_id}: Combined SOAP generation failed, falling back to section-by-section - {str(combined_error)}"
+                )
+
+        # Fallback: define the sections and their prompts
         sections = [
             ("Subjective", SOAP_SUBJECTIVE_PROMPT),
             ("Objective", SOAP_OBJECTIVE_PROMPT),
@@ -100,44 +232,96 @@ async def generate_soap_note(transcript: str, visit_id: str) -> str:
             ("Plan", SOAP_PLAN_PROMPT),
         ]
 
-        soap_sections = []
+        if llm_engine.vllm_enabled():
+            # vLLM coalesces concurrent requests into one continuous batch
+            # itself, so run the per-section coroutines under gather and let
+            # the engine schedule them together.
+            completed_sections = 0
 
-        for i, (section_name, section_prompt) in enumerate(sections):
-            # Update progress tracking
-            visits_store[visit_id]["current_section"] = section_name
-            section_progress = 50 + int((i / len(sections)) * 40)
-            visits_store[visit_id]["progress"] = section_progress
+            async def generate_and_track(
+                section_name: str, section_prompt: str
+            ) -> str:
+                nonlocal completed_sections
+                section_content = await generate_soap_section(
+                    transcript, section_prompt, section_name, visit_id
+                )
+                completed_sections += 1
+                section_progress = 50 + int(
+                    (completed_sections / len(sections)) * 40
+                )
+                update_visit(
+                    visit_id,
+                    completed_sections=completed_sections,
+                    progress=section_progress,
+                )
+                logger.info(
+                    f"Visit {visit_id}: {section_name} section done ({completed_sections}/{len(sections)}) - Progress: {section_progress}%"
+                )
+                return section_content
 
-            logger.info(
-                f"Visit {visit_id}: Generating {section_name} section ({i + 1}/{len(sections)}) - Progress: {section_progress}%"
+            soap_sections = await asyncio.gather(
+                *[
+                    generate_and_track(section_name, section_prompt)
+                    for section_name, section_prompt in sections
+                ]
             )
+        else:
+            # Transformers path: resolve canned sections first, then decode
+            # every remaining prompt in one left-padded batched generate call,
+            # amortizing the transcript prefill and launch overhead across
+            # sections instead of paying them four times.
+            results = {}
+            pending = []
+            for section_name, section_prompt in sections:
+                canned = get_canned_section(transcript, section_name)
+                if canned is not None:
+                    logger.info(
+                        f"Visit {visit_id}: {section_name} section short-circuited - no evidence in short transcript"
+                    )
+                    results[section_name] = canned
+                else:
+                    pending.append((section_name, section_prompt))
 
-            # Generate this section
-            section_content = await generate_soap_section(
-                transcript, section_prompt, section_name, visit_id
+            if pending:
+                update_visit(
+                    visit_id, completed_sections=len(results), progress=55
+                )
+                logger.info(
+                    f"Visit {visit_id}: Generating {len(pending)} sections in one batched call"
+                )
+                batched_outputs = await generate_section_responses_batched(
+                    [section_prompt for _, section_prompt in pending],
+                    transcript,
+                    max_new_tokens=SOAP_SECTION_MAX_TOKENS,
+                )
+                for (section_name, _), section_content in zip(
+                    pending, batched_outputs
+                ):
+                    results[section_name] = clean_soap_formatting(
+                        section_content, section_name
+                    ).strip()
+
+            update_visit(
+                visit_id, completed_sections=len(sections), progress=90
             )
-            soap_sections.append(section_content)
+            soap_sections = [results[section_name] for section_name, _ in sections]
 
         # Combine all sections
         full_soap_note = "\n\n".join(soap_sections)
 
         # Clean up progress tracking fields
-        if "current_section" in visits_store[visit_id]:
-            del visits_store[visit_id]["current_section"]
+        remove_visit_fields(visit_id, "completed_sections")
 
-        visits_store[visit_id]["progress"] = 90
+        update_visit(visit_id, progress=90)
         logger.info(
-            f"Visit {visit_id}: Agentic SOAP note generation completed. Total length: {len(full_soap_note)} characters"
+            f"Visit {visit_id}: Section-by-section SOAP note generation completed. Total length: {len(full_soap_note)} characters"
         )
 
         return full_soap_note.strip()
 
     except Exception as e:
         # Clean up progress tracking fields on error
-        if "current_section" in visits_store[visit_id]:
-            del visits_store[visit_id]["current_section"]
+        remove_visit_fields(visit_id, "completed_sections")
 
-        logger.error(
-            f"Visit {visit_id}: Agentic SOAP note generation failed - {str(e)}"
-        )
+        logger.error(f"Visit {visit_id}: SOAP note generation failed - {str(e)}")
         raise Exception(f"SOAP note generation failed: {str(e)}")
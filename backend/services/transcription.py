@@ -1,23 +1,281 @@
 """Audio transcription service using Whisper."""
 
 import os
+import math
+import time
 import asyncio
+import logging
 import torch
 import librosa
+import numpy as np
 import soundfile as sf
-from helpers.audio_converter import convert_to_wav_with_ffmpeg
+from helpers.audio_converter import stream_pcm_from_ffmpeg
 from helpers.text_utils import remove_overlap
 from configs.settings import (
     CHUNK_DURATION,
     OVERLAP_DURATION,
     SAMPLE_RATE,
     MAX_OVERLAP_CHARS,
+    WHISPER_BATCH_SIZE,
+    WHISPER_CONCURRENCY,
+    WHISPER_SILENCE_RMS,
 )
+from utils.device import cpu_bf16_supported
 from utils.logger import logger
-from utils.storage import visits_store
+from utils.storage import visits_store, update_visit, remove_visit_fields
+from services import whisper_engine
 from services.model_manager import model_manager
 
 
+# Bounds how many visits run model inference simultaneously; the queue of
+# waiters drains in FIFO order as each visit's transcription finishes
+_whisper_semaphore = asyncio.Semaphore(WHISPER_CONCURRENCY)
+
+
+async def _safe_unlink(file_path: str, visit_id: str, description: str) -> None:
+    """
+    Delete a file without blocking the event loop.
+
+    A single unlink replaces the old exists-then-remove pair (one fewer
+    stat per path), and an already-missing file is simply ignored.
+    """
+    try:
+        await asyncio.to_thread(os.unlink, file_path)
+        logger.info(f"Visit {visit_id}: Cleaned up {description}: {file_path}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(
+            f"Visit {visit_id}: Failed to clean up {description}: {str(e)}"
+        )
+
+
+def _load_audio(file_path: str, target_sr: int):
+    """
+    Load audio with libsndfile and a polyphase FIR resample.
+
+    soundfile decodes in C and scipy's resample_poly is a C FIR filter, so
+    the common formats avoid librosa's Python-level resampy path entirely.
+
+    Args:
+        file_path: Path to the audio file
+        target_sr: Desired sample rate
+
+    Returns:
+        tuple: (float32 waveform, sample rate)
+    """
+    data, sr = sf.read(file_path, dtype="float32", always_2d=False)
+    if data.ndim > 1:
+        # Downmix stereo by averaging channels
+        data = data.mean(axis=1)
+    if sr != target_sr:
+        import scipy.signal
+
+        data = scipy.signal.resample_poly(data, target_sr, sr).astype("float32")
+        sr = target_sr
+    return data, sr
+
+
+async def _transcribe_chunked(audio, sr: int, visit_id: str) -> str:
+    """
+    Transcribe a loaded waveform with the in-process HF Whisper model.
+
+    Slices the audio into overlapping chunks, decodes them in mini-batches,
+    and stitches the per-chunk texts with overlap removal.
+
+    Args:
+        audio: float32 waveform at the target sample rate
+        sr: Sample rate of the waveform
+        visit_id: Visit ID for tracking
+
+    Returns:
+        str: Transcribed text
+    """
+    # Chunk settings. A window starting at (num_chunks - 1) * stride covers
+    # the tail as long as it starts before len(audio) - overlap_length; the
+    # old ceil-by-stride formula over-counted and decoded an extra window of
+    # already-covered (or padded-silence) audio at the tail
+    chunk_length = CHUNK_DURATION * sr
+    overlap_length = OVERLAP_DURATION * sr
+    num_chunks = max(
+        1,
+        math.ceil(
+            max(0, len(audio) - overlap_length) / (chunk_length - overlap_length)
+        ),
+    )
+
+    logger.info(
+        f"Visit {visit_id}: Processing {num_chunks} audio chunks for transcription"
+    )
+
+    # Phase 1: build every chunk window as one zero-copy strided view.
+    # The tail is zero-padded to a full window, matching the zeros the
+    # processor would pad each 30s feature frame with anyway
+    stride = chunk_length - overlap_length
+    padded_length = (num_chunks - 1) * stride + chunk_length
+    if padded_length > len(audio):
+        audio = np.pad(audio, (0, padded_length - len(audio)))
+    windows = np.lib.stride_tricks.sliding_window_view(audio, chunk_length)[::stride]
+
+    # Silence gate: an RMS check per window costs one vectorized pass over
+    # the audio, while a silent chunk would still pay the full encoder and
+    # decoder cost and usually decode into hallucinated text
+    if WHISPER_SILENCE_RMS > 0:
+        rms = np.sqrt(np.mean(np.square(windows, dtype=np.float32), axis=1))
+        speech_indices = np.flatnonzero(rms >= WHISPER_SILENCE_RMS)
+        if len(speech_indices) < num_chunks:
+            logger.info(
+                f"Visit {visit_id}: Skipping {num_chunks - len(speech_indices)} "
+                f"silent chunks below RMS {WHISPER_SILENCE_RMS}"
+            )
+    else:
+        speech_indices = np.arange(num_chunks)
+
+    if len(speech_indices) == 0:
+        logger.info(f"Visit {visit_id}: No speech detected in audio")
+        update_visit(visit_id, chunk_status="completed")
+        return ""
+
+    chunks = [windows[i] for i in speech_indices]
+    num_speech = len(chunks)
+
+    # ONNX-backed models carry no dtype attribute; their features stay fp32
+    model_dtype = getattr(model_manager.whisper_model, "dtype", torch.float32)
+    loop = asyncio.get_running_loop()
+
+    # Whisper features always span a fixed 30-second window
+    feature_window = 30 * sr
+    use_cuda = torch.cuda.is_available()
+
+    def extract_features(batch_chunks, slot):
+        """Extract mel features for one mini-batch and move them on-device."""
+        # Staging through pinned memory lets the host-to-device copy run as
+        # async DMA, overlapping with the decode of the previous mini-batch
+        if model_manager.gpu_mel_enabled():
+            # Pad the waveforms on CPU, ship one tensor, and run the mel on
+            # the GPU instead of the processor's per-chunk NumPy path
+            waveforms = torch.zeros(
+                (len(batch_chunks), feature_window),
+                dtype=torch.float32,
+                pin_memory=use_cuda,
+            )
+            for row, chunk in enumerate(batch_chunks):
+                waveforms[row, : len(chunk)] = torch.from_numpy(
+                    np.ascontiguousarray(chunk)
+                )
+            return model_manager.compute_whisper_features(
+                waveforms.to(model_manager.device, non_blocking=True)
+            )
+        features = model_manager.whisper_processor(
+            batch_chunks, sampling_rate=sr, return_tensors="pt", padding=True
+        ).input_features
+        if use_cuda:
+            rows = features.shape[0]
+            # Cast the fp32 features straight into a preallocated pinned
+            # block (copy_ converts dtype in place); casting after pinning
+            # would allocate a fresh pageable tensor and silently turn the
+            # device copy below into a synchronous one
+            staging = model_manager.whisper_pinned_buffer(
+                slot, features.shape, model_dtype
+            )
+            staging[:rows].copy_(features)
+            # Copy into a resident device buffer instead of allocating a
+            # fresh tensor per mini-batch
+            buffer = model_manager.whisper_feature_buffer(
+                slot, features.shape, model_dtype
+            )
+            buffer[:rows].copy_(staging[:rows], non_blocking=True)
+            return buffer[:rows]
+        return features.to(model_manager.device, dtype=model_dtype)
+
+    # bf16 autocast on CPUs with native support (AVX-512 BF16 / AMX) roughly
+    # doubles GEMM throughput against fp32 while keeping fp32 weights
+    cpu_bf16 = model_manager.device == "cpu" and cpu_bf16_supported()
+
+    def decode_batch(batch_features):
+        """Run one batched generate + decode for a mini-batch."""
+        with torch.inference_mode():
+            if cpu_bf16:
+                with torch.autocast("cpu", dtype=torch.bfloat16):
+                    predicted_ids = model_manager.whisper_model.generate(
+                        batch_features
+                    )
+            else:
+                predicted_ids = model_manager.whisper_model.generate(batch_features)
+        return model_manager.whisper_processor.batch_decode(
+            predicted_ids, skip_special_tokens=True
+        )
+
+    # Phase 2: decode in mini-batches. Batched generate amortizes the
+    # encoder forward and kernel launches across chunks, and feature
+    # extraction for batch i+1 runs on a CPU thread while batch i decodes,
+    # keeping both sides of the pipeline busy
+    batches = [
+        chunks[batch_start : batch_start + WHISPER_BATCH_SIZE]
+        for batch_start in range(0, num_speech, WHISPER_BATCH_SIZE)
+    ]
+    next_features = loop.run_in_executor(None, extract_features, batches[0], 0)
+
+    chunk_texts = []
+    for batch_index, batch in enumerate(batches):
+        input_features = await next_features
+        if batch_index + 1 < len(batches):
+            next_features = loop.run_in_executor(
+                None, extract_features, batches[batch_index + 1], (batch_index + 1) % 2
+            )
+
+        batch_end = min((batch_index + 1) * WHISPER_BATCH_SIZE, num_speech)
+
+        # Progress calculation: 10% to 35% during transcription
+        chunk_progress = 10 + int((batch_index * WHISPER_BATCH_SIZE / num_speech) * 25)
+        update_visit(
+            visit_id,
+            current_chunk=batch_end,
+            total_chunks=num_speech,
+            chunk_status="processing",
+            progress=chunk_progress,
+        )
+
+        # Lazy %s formatting: skipped entirely when INFO is disabled, and
+        # interpolation is deferred to the listener thread otherwise
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Visit %s: Transcribing chunks %d-%d/%d (Progress: %d%%)",
+                visit_id,
+                batch_end - len(batch) + 1,
+                batch_end,
+                num_speech,
+                chunk_progress,
+            )
+
+        chunk_texts.extend(
+            await loop.run_in_executor(None, decode_batch, input_features)
+        )
+
+        # Progress is pushed to SSE subscriber queues at the update above,
+        # so a bare yield to the loop is enough; no fixed delay needed
+        await asyncio.sleep(0)
+
+    update_visit(visit_id, chunk_status="completed")
+
+    # Stitch the chunk transcriptions in order; gated-out silent chunks
+    # contribute nothing, and the speech texts keep their original order so
+    # overlap removal still sees adjacent windows back to back.
+    # Accumulating into a list
+    # and joining once is linear in total characters, and only a bounded
+    # tail of the stitched text is kept for the overlap check — overlap
+    # never reaches further back than MAX_OVERLAP_CHARS anyway
+    parts = []
+    tail = ""
+    for transcription in chunk_texts:
+        if tail and transcription:
+            transcription = remove_overlap(tail, transcription, MAX_OVERLAP_CHARS)
+        parts.append(transcription)
+        tail = (tail + " " + transcription)[-MAX_OVERLAP_CHARS:]
+
+    return " ".join(parts)
+
+
 async def transcribe_audio(file_path: str, visit_id: str) -> str:
     """
     Transcribe audio file using Whisper model.
@@ -34,9 +292,8 @@ async def transcribe_audio(file_path: str, visit_id: str) -> str:
     """
     try:
         # Update progress and start timing
-        transcription_start_time = asyncio.get_event_loop().time()
-        visits_store[visit_id]["status"] = "analyzing_audio"
-        visits_store[visit_id]["progress"] = 10
+        transcription_start_time = time.perf_counter()
+        update_visit(visit_id, status="analyzing_audio", progress=10)
         logger.info(
             f"Visit {visit_id}: Starting audio transcription from file: {file_path}"
         )
@@ -44,47 +301,42 @@ async def transcribe_audio(file_path: str, visit_id: str) -> str:
         # Load audio with FFmpeg conversion support
         converted_file_path = None
         try:
-            audio, sr = librosa.load(file_path, sr=SAMPLE_RATE)
+            # Decode/resample on a worker thread so the event loop keeps
+            # servicing uploads and SSE streams during the load. libsndfile
+            # handles the common formats with C decode + C FIR resample
+            audio, sr = await asyncio.to_thread(_load_audio, file_path, SAMPLE_RATE)
             logger.info(
-                f"Visit {visit_id}: Audio loaded successfully with librosa. Duration: {len(audio) / sr:.2f}s"
+                f"Visit {visit_id}: Audio loaded successfully with soundfile. Duration: {len(audio) / sr:.2f}s"
             )
 
         except Exception as soundfile_error:
             logger.warning(
-                f"Visit {visit_id}: librosa failed to load audio directly: {str(soundfile_error)}"
+                f"Visit {visit_id}: soundfile failed to load audio directly: {str(soundfile_error)}"
             )
-            logger.info(f"Visit {visit_id}: Attempting FFmpeg conversion to WAV format")
+            logger.info(f"Visit {visit_id}: Attempting librosa fallback")
 
             try:
-                # Try converting with FFmpeg
-                converted_file_path = convert_to_wav_with_ffmpeg(file_path, visit_id)
-
-                # Now try loading the converted file
-                audio, sr = librosa.load(converted_file_path, sr=SAMPLE_RATE)
+                # librosa reaches formats libsndfile can't open
+                audio, sr = await asyncio.to_thread(
+                    librosa.load, file_path, sr=SAMPLE_RATE
+                )
                 logger.info(
-                    f"Visit {visit_id}: Audio loaded successfully after FFmpeg conversion. Duration: {len(audio) / sr:.2f}s"
+                    f"Visit {visit_id}: Audio loaded successfully with librosa. Duration: {len(audio) / sr:.2f}s"
                 )
 
-            except Exception as ffmpeg_error:
-                logger.error(
-                    f"Visit {visit_id}: FFmpeg conversion also failed: {str(ffmpeg_error)}"
-                )
-                logger.info(
-                    f"Visit {visit_id}: Attempting final fallback with soundfile"
+            except Exception as librosa_error:
+                logger.warning(
+                    f"Visit {visit_id}: librosa also failed: {str(librosa_error)}"
                 )
+                logger.info(f"Visit {visit_id}: Attempting FFmpeg decoding")
 
                 try:
-                    # Final fallback: try soundfile directly
-                    audio, sr = sf.read(file_path)
-                    if sr != SAMPLE_RATE:
-                        import scipy.signal
-
-                        audio = scipy.signal.resample(
-                            audio, int(len(audio) * SAMPLE_RATE / sr)
-                        )
-                        sr = SAMPLE_RATE
+                    # Decode straight to PCM over a pipe; no intermediate WAV
+                    # file is written or re-read
+                    audio = await stream_pcm_from_ffmpeg(file_path, visit_id)
+                    sr = SAMPLE_RATE
                     logger.info(
-                        f"Visit {visit_id}: Audio loaded successfully with soundfile. Duration: {len(audio) / sr:.2f}s"
+                        f"Visit {visit_id}: Audio loaded successfully after FFmpeg decoding. Duration: {len(audio) / sr:.2f}s"
                     )
                 except Exception as final_error:
                     logger.error(
@@ -95,146 +347,62 @@ async def transcribe_audio(file_path: str, visit_id: str) -> str:
                     )
 
         # Store audio duration
-        visits_store[visit_id]["audio_duration"] = len(audio) / sr
-
-        # Chunk settings
-        chunk_length = CHUNK_DURATION * sr
-        overlap_length = OVERLAP_DURATION * sr
-        num_chunks = (len(audio) + chunk_length - 1) // (chunk_length - overlap_length)
-
-        full_text = ""
-
-        logger.info(
-            f"Visit {visit_id}: Processing {num_chunks} audio chunks for transcription"
-        )
-
-        for i in range(num_chunks):
-            start = i * (chunk_length - overlap_length)
-            end = min(start + chunk_length, len(audio))
-            chunk = audio[start:end]
-
-            # Update progress tracking for this chunk
-            visits_store[visit_id]["current_chunk"] = i + 1
-            visits_store[visit_id]["total_chunks"] = num_chunks
-            visits_store[visit_id]["chunk_status"] = "processing"
-
-            # Progress calculation: 10% to 35% during transcription
-            chunk_progress = 10 + int((i / num_chunks) * 25)
-            visits_store[visit_id]["progress"] = chunk_progress
-
-            logger.info(
-                f"Visit {visit_id}: Processing chunk {i + 1}/{num_chunks} (Progress: {chunk_progress}%)"
-            )
-
-            # Process chunk with Whisper
-            inputs = model_manager.whisper_processor(
-                chunk, sampling_rate=sr, return_tensors="pt"
-            )
-            inputs = inputs.input_features.to(model_manager.device)
-
-            # Generate transcription
-            with torch.no_grad():
-                predicted_ids = model_manager.whisper_model.generate(inputs)
-
-            transcription = model_manager.whisper_processor.batch_decode(
-                predicted_ids, skip_special_tokens=True
-            )[0]
-
-            # Remove overlap between chunks
-            if full_text and transcription:
-                transcription = remove_overlap(
-                    full_text, transcription, MAX_OVERLAP_CHARS
+        update_visit(visit_id, audio_duration=len(audio) / sr)
+
+        async with _whisper_semaphore:
+            if whisper_engine.faster_whisper_enabled():
+                # faster-whisper does VAD-based chunking and batched int8
+                # decoding internally, replacing the manual chunk/overlap
+                # path; it runs on a worker thread and reports progress back
+                # through the loop passed in
+                full_text = await asyncio.to_thread(
+                    whisper_engine.transcribe_with_faster_whisper,
+                    audio,
+                    len(audio) / sr,
+                    visit_id,
+                    asyncio.get_running_loop(),
                 )
-
-            full_text += " " + transcription
-            visits_store[visit_id]["chunk_status"] = "completed"
-
-            logger.info(
-                f"Visit {visit_id}: Chunk {i + 1}/{num_chunks} completed. Chunk text length: {len(transcription)}"
-            )
-
-            # Small delay to allow SSE to send updates
-            await asyncio.sleep(0.05)
-
-        visits_store[visit_id]["status"] = "extracting_text"
-        visits_store[visit_id]["progress"] = 40
-        visits_store[visit_id]["transcript"] = full_text.strip()
+            else:
+                full_text = await _transcribe_chunked(audio, sr, visit_id)
+
+        update_visit(
+            visit_id,
+            status="extracting_text",
+            progress=40,
+            transcript=full_text.strip(),
+        )
 
         # Clean up ALL chunk processing fields after transcription completion
-        chunk_fields_to_remove = [
-            "current_chunk",
-            "total_chunks",
-            "chunk_status",
-        ]
-        for field in chunk_fields_to_remove:
-            visits_store[visit_id].pop(field, None)
+        remove_visit_fields(visit_id, "current_chunk", "total_chunks", "chunk_status")
 
         # Calculate transcription time
-        transcription_end_time = asyncio.get_event_loop().time()
+        transcription_end_time = time.perf_counter()
         transcription_duration = transcription_end_time - transcription_start_time
-        visits_store[visit_id]["transcription_time"] = transcription_duration
+        update_visit(visit_id, transcription_time=transcription_duration)
 
         logger.info(
             f"Visit {visit_id}: Transcription completed. Transcript length: {len(full_text)} characters, Duration: {transcription_duration:.2f}s"
         )
 
-        # Clean up converted file if it was created
-        if converted_file_path and os.path.exists(converted_file_path):
-            try:
-                os.remove(converted_file_path)
-                logger.info(
-                    f"Visit {visit_id}: Cleaned up converted audio file: {converted_file_path}"
-                )
-            except Exception as e:
-                logger.warning(
-                    f"Visit {visit_id}: Failed to clean up converted file: {str(e)}"
-                )
-
-        # Clean up original audio file after successful transcription
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                logger.info(
-                    f"Visit {visit_id}: Cleaned up original audio file: {file_path}"
-                )
-            except Exception as e:
-                logger.warning(
-                    f"Visit {visit_id}: Failed to clean up original audio file: {str(e)}"
-                )
+        # Clean up the converted file (if created) and the original upload
+        if converted_file_path:
+            await _safe_unlink(converted_file_path, visit_id, "converted audio file")
+        await _safe_unlink(file_path, visit_id, "original audio file")
 
-        # Small delay to allow SSE to send the clean status update without chunk info
-        await asyncio.sleep(0.1)
+        # Yield once so the pushed clean status update (without chunk info)
+        # is dispatched before returning
+        await asyncio.sleep(0)
 
         return full_text.strip()
 
     except Exception as e:
-        # Clean up converted file if it was created and an error occurred
-        if (
-            "converted_file_path" in locals()
-            and converted_file_path
-            and os.path.exists(converted_file_path)
-        ):
-            try:
-                os.remove(converted_file_path)
-                logger.info(
-                    f"Visit {visit_id}: Cleaned up converted file after error: {converted_file_path}"
-                )
-            except Exception as cleanup_e:
-                logger.warning(
-                    f"Visit {visit_id}: Failed to clean up converted file after error: {str(cleanup_e)}"
-                )
-
-        # Clean up original audio file even if transcription failed
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                logger.info(
-                    f"Visit {visit_id}: Cleaned up original audio file after error: {file_path}"
-                )
-            except Exception as cleanup_e:
-                logger.warning(
-                    f"Visit {visit_id}: Failed to clean up original audio file after error: {str(cleanup_e)}"
-                )
+        # Clean up the converted file (if it got created) and the original
+        # audio even though transcription failed
+        if "converted_file_path" in locals() and converted_file_path:
+            await _safe_unlink(
+                converted_file_path, visit_id, "converted file after error"
+            )
+        await _safe_unlink(file_path, visit_id, "original audio file after error")
 
         logger.error(f"Visit {visit_id}: Transcription failed - {str(e)}")
         raise Exception(f"Transcription failed: {str(e)}")
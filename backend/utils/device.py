@@ -1,8 +1,10 @@
 """Device detection and setup utilities."""
 import torch
+from functools import lru_cache
 from utils.logger import logger
 
 
+@lru_cache(maxsize=1)
 def get_device() -> str:
     """Detect and return the best available device (cuda, mps, or cpu)."""
     if torch.cuda.is_available():
@@ -16,6 +18,16 @@ def get_device() -> str:
     return device
 
 
+@lru_cache(maxsize=1)
+def cpu_bf16_supported() -> bool:
+    """True when the CPU has native bfloat16 support (AVX-512 BF16 / AMX)."""
+    try:
+        return bool(torch.cpu._is_avx512_bf16_supported())
+    except AttributeError:
+        return False
+
+
+@lru_cache(maxsize=None)
 def get_model_dtype(device: str) -> torch.dtype:
     """
     Get the appropriate dtype for the model based on device.
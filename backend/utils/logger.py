@@ -1,10 +1,19 @@
 """Logging configuration."""
+import queue
+import atexit
 import logging
+import logging.handlers
 from configs.settings import LOG_LEVEL, LOG_FORMAT, LOG_FILE
 
 
 def setup_logger(name: str = __name__) -> logging.Logger:
-    """Set up and return a logger instance."""
+    """
+    Set up and return a logger instance.
+
+    Records are handed to a QueueHandler — a lock plus a list append — and a
+    QueueListener thread owns the real console/file handlers, so disk and
+    terminal I/O never runs on the event-loop thread that emitted the log.
+    """
     logger = logging.getLogger(name)
 
     if not logger.handlers:
@@ -15,13 +24,26 @@ def setup_logger(name: str = __name__) -> logging.Logger:
         console_handler.setLevel(getattr(logging, LOG_LEVEL))
         console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
-        # File handler
+        # File handler, buffered so writes hit the disk in batches; errors
+        # (and shutdown) flush immediately
         file_handler = logging.FileHandler(LOG_FILE)
         file_handler.setLevel(getattr(logging, LOG_LEVEL))
         file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        buffered_file_handler = logging.handlers.MemoryHandler(
+            capacity=1024, flushLevel=logging.ERROR, target=file_handler
+        )
+
+        log_queue = queue.Queue(-1)
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+        listener = logging.handlers.QueueListener(
+            log_queue,
+            console_handler,
+            buffered_file_handler,
+            respect_handler_level=True,
+        )
+        listener.start()
+        atexit.register(listener.stop)
 
     return logger
 
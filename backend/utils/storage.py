@@ -1,5 +1,198 @@
-"""In-memory storage for visit data."""
-from typing import Dict
+"""Visit data storage with optional Redis persistence."""
+import json
+import queue
+import asyncio
+import threading
+from typing import Dict, List
 
-# In-memory hashmap to store visit data
-visits_store: Dict[str, dict] = {}
+from configs.settings import REDIS_URL, VISIT_TTL_SECONDS
+from utils.logger import logger
+
+try:
+    import redis
+    import redis.asyncio
+
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class VisitStore:
+    """
+    Dict-like store for visit data.
+
+    Visits live in a process-local dict for fast hot-path access. When
+    REDIS_URL is configured (and the redis package is installed), visit
+    snapshots are written through to Redis with a TTL by a background writer
+    thread, so the pipeline's frequent progress updates never block the
+    event loop on a network round trip. Recovery reads (after a restart, or
+    for visits owned by another worker) go through the awaitable load();
+    the synchronous dict API never touches the network.
+    """
+
+    def __init__(self):
+        self._local: Dict[str, dict] = {}
+        self._redis = None
+        self._redis_async = None
+        if REDIS_URL and REDIS_AVAILABLE:
+            try:
+                self._redis = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+                self._redis.ping()
+                self._redis_async = redis.asyncio.Redis.from_url(
+                    REDIS_URL, decode_responses=True
+                )
+                logger.info("Visit store persisting to Redis")
+            except Exception as e:
+                logger.warning(f"Redis unavailable, using in-memory store only: {e}")
+                self._redis = None
+        if self._redis is not None:
+            self._write_queue: queue.SimpleQueue = queue.SimpleQueue()
+            threading.Thread(
+                target=self._writer_loop, name="visit-store-writer", daemon=True
+            ).start()
+
+    @staticmethod
+    def _key(visit_id: str) -> str:
+        return f"visit:{visit_id}"
+
+    def get(self, visit_id: str, default=None):
+        """Local-only read; use load() where a Redis fallback is wanted."""
+        return self._local.get(visit_id, default)
+
+    async def load(self, visit_id: str, default=None):
+        """
+        Read a visit, falling back to Redis on a local miss.
+
+        The fallback awaits the asyncio Redis client, so recovery reads in
+        request handlers yield during the round trip instead of blocking
+        the event loop. Recovered visits are cached locally.
+        """
+        visit_data = self._local.get(visit_id)
+        if visit_data is None and self._redis_async is not None:
+            try:
+                raw = await self._redis_async.get(self._key(visit_id))
+            except Exception as e:
+                logger.warning(f"Visit {visit_id}: Redis read failed: {e}")
+                raw = None
+            if raw:
+                visit_data = json.loads(raw)
+                self._local[visit_id] = visit_data
+        return default if visit_data is None else visit_data
+
+    def __getitem__(self, visit_id: str) -> dict:
+        visit_data = self.get(visit_id)
+        if visit_data is None:
+            raise KeyError(visit_id)
+        return visit_data
+
+    def __setitem__(self, visit_id: str, visit_data: dict) -> None:
+        self._local[visit_id] = visit_data
+        self.persist(visit_id)
+
+    def __contains__(self, visit_id: str) -> bool:
+        return self.get(visit_id) is not None
+
+    def values(self):
+        return self._local.values()
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def persist(self, visit_id: str) -> None:
+        """Queue the visit snapshot for write-through (no-op if unconfigured)."""
+        if self._redis is None:
+            return
+        visit_data = self._local.get(visit_id)
+        if visit_data is None:
+            return
+        # Snapshot on the caller's thread so the writer never serializes a
+        # dict that is still being mutated; hand-off is a queue put, never a
+        # network round trip
+        self._write_queue.put((visit_id, dict(visit_data)))
+
+    def _writer_loop(self) -> None:
+        """
+        Drain the write queue and push snapshots to Redis.
+
+        Runs on a daemon thread so persist() costs the event loop nothing.
+        Bursts of updates to the same visit coalesce into a single SET —
+        only the latest snapshot matters, and the pipeline emits one update
+        per mini-batch and per progress edge.
+        """
+        while True:
+            visit_id, snapshot = self._write_queue.get()
+            pending = {visit_id: snapshot}
+            while True:
+                try:
+                    visit_id, snapshot = self._write_queue.get_nowait()
+                    pending[visit_id] = snapshot
+                except queue.Empty:
+                    break
+            for visit_id, snapshot in pending.items():
+                try:
+                    self._redis.set(
+                        self._key(visit_id), json.dumps(snapshot), ex=VISIT_TTL_SECONDS
+                    )
+                except Exception as e:
+                    logger.warning(f"Visit {visit_id}: Redis persist failed: {e}")
+
+
+# Store for visit data (in-memory, optionally persisted to Redis)
+visits_store = VisitStore()
+
+# Content hash (sha256 hex) of each successfully processed upload, mapped to
+# the visit that produced its SOAP note; used to dedupe identical re-uploads
+processed_hashes: Dict[str, str] = {}
+
+# Per-visit SSE subscriber queues; each open progress stream registers one
+_visit_subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+
+def subscribe_to_visit(visit_id: str) -> asyncio.Queue:
+    """Register and return a subscriber queue for a visit's progress updates."""
+    queue = asyncio.Queue()
+    _visit_subscribers.setdefault(visit_id, []).append(queue)
+    return queue
+
+
+def unsubscribe_from_visit(visit_id: str, queue: asyncio.Queue) -> None:
+    """Remove a subscriber queue registered via subscribe_to_visit."""
+    subscribers = _visit_subscribers.get(visit_id)
+    if subscribers is None:
+        return
+    try:
+        subscribers.remove(queue)
+    except ValueError:
+        pass
+    if not subscribers:
+        _visit_subscribers.pop(visit_id, None)
+
+
+def notify_visit_update(visit_id: str) -> None:
+    """Push a snapshot of the visit's current state to all subscribers."""
+    visit_data = visits_store.get(visit_id)
+    if visit_data is None:
+        return
+    for queue in _visit_subscribers.get(visit_id, []):
+        queue.put_nowait(dict(visit_data))
+
+
+def update_visit(visit_id: str, **fields) -> None:
+    """Update visit fields, persist, and notify progress subscribers."""
+    visit_data = visits_store.get(visit_id)
+    if visit_data is None:
+        return
+    visit_data.update(fields)
+    visits_store.persist(visit_id)
+    notify_visit_update(visit_id)
+
+
+def remove_visit_fields(visit_id: str, *fields: str) -> None:
+    """Remove transient visit fields, persist, and notify subscribers."""
+    visit_data = visits_store.get(visit_id)
+    if visit_data is None:
+        return
+    for field in fields:
+        visit_data.pop(field, None)
+    visits_store.persist(visit_id)
+    notify_visit_update(visit_id)